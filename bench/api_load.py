@@ -0,0 +1,95 @@
+# bench/api_load.py
+"""
+Local load test for the headless API (rca.api).
+
+    python -m rca.api --port 8000 --workers 4 &
+    python bench/api_load.py --url http://127.0.0.1:8000 --endpoint /questions --concurrency 8 --requests 200
+
+Reports requests/sec, status counts and latency percentiles.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _sample_passage() -> str:
+    with open(os.path.join(ROOT, "data", "sample_passages.json"), "r", encoding="utf-8") as f:
+        return json.load(f)[0]["text"]
+
+def _payload(endpoint: str) -> dict:
+    passage = _sample_passage()
+    questions = [{"id": "q1", "qtype": "cloze", "prompt": "Fill in the blank: The ____ sprinted quickly.",
+                  "options": [], "correct_answer": "hare", "evidence": "The hare sprinted quickly."}]
+    return {
+        "/questions": {"passage": passage, "n": 6},
+        "/grade/mcq": {"user_answer": "Mina", "correct_answer": "mina"},
+        "/grade/short_answer": {"user_answer": "the hares sprinted", "correct_answer": "The hare sprinted"},
+        "/pdf/quiz": {"passage": passage, "questions": questions},
+        "/pdf/answer_key": {"passage": passage, "questions": questions},
+        "/passage": {"grade": "3", "level": "Core", "length": "Short (120–180 words)"},
+    }[endpoint]
+
+def percentile(values, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values) - 1, max(0, int(round(p / 100.0 * (len(values) - 1)))))
+    return values[idx]
+
+def run(url: str, endpoint: str, concurrency: int, total: int):
+    body = json.dumps(_payload(endpoint)).encode("utf-8")
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            req = urllib.request.Request(url + endpoint, data=body, headers={"Content-Type": "application/json"})
+            t0 = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=180) as resp:
+                    resp.read()
+                    status = resp.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except Exception:
+                status = "error"
+            dt = time.perf_counter() - t0
+            with lock:
+                latencies.append(dt)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    print(f"endpoint     {endpoint}")
+    print(f"requests     {len(latencies)} in {elapsed:.2f}s, concurrency {concurrency}")
+    print(f"throughput   {len(latencies) / elapsed:.1f} req/s")
+    print(f"statuses     {statuses}")
+    for p in (50, 90, 95, 99):
+        print(f"p{p:<11} {percentile(latencies, p) * 1000:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the RCA headless API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", default="/questions")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    run(args.url.rstrip("/"), args.endpoint, args.concurrency, args.requests)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+# bench/app_load.py
+"""
+Concurrent-session load test for the Streamlit app.
+
+    python bench/app_load.py --teachers 4 --students 12 --iterations 2
+
+Drives app.py headlessly with Streamlit's AppTest: every simulated session
+is its own AppTest (its own session state and script runs) on its own
+thread, and all sessions start together. Teachers log in, generate a
+passage, hand it to the quiz editor, generate questions, edit one, build
+the PDFs and log out; students log in, take the quiz assigned to their
+class and log out. Prints latency percentiles per step plus the process's
+CPU time and peak memory.
+
+Runs offline: Gemini is replaced by a stub with a fixed latency
+(--gemini-latency), and the user directory, assignments and parse cache go
+to a temporary directory unless --data-dir is given. The spaCy model must
+be installed.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from api_load import percentile  # noqa: E402  (same directory)
+
+APP_PATH = os.path.join(ROOT, "app.py")
+TEACHER = ("teacher_sam", "securepass")
+STUDENTS = [("student_test1", "securepass"), ("student_test2", "securepass")]
+CLASS_NAME = "Class 1"
+TEACHER_STEPS = ["open", "login", "open_create_passage", "generate_passage", "to_editor",
+                 "generate_questions", "edit_question", "build_pdfs", "logout"]
+STUDENT_STEPS = ["open", "login_and_load_quiz", "submit_quiz", "logout"]
+
+def _samples() -> List[str]:
+    with open(os.path.join(ROOT, "data", "sample_passages.json"), "r", encoding="utf-8") as f:
+        return [s["text"] for s in json.load(f)]
+
+# --- Offline Gemini ---
+
+def install_gemini_stub(latency: float):
+    """Swaps the SDK used by rca.gemini_client for a local stub that answers after `latency` seconds."""
+    from rca import gemini_client
+    passages = _samples()
+    counter = iter(range(1 << 62))
+    lock = threading.Lock()
+
+    class _Model:
+        def __init__(self, name, system_instruction=None):
+            self.name = name
+
+        def generate_content(self, prompt, generation_config=None):
+            time.sleep(latency)
+            with lock:
+                i = next(counter)
+            return SimpleNamespace(text=passages[i % len(passages)])
+
+    gemini_client.genai = SimpleNamespace(
+        configure=lambda api_key=None: None,
+        list_models=lambda: [SimpleNamespace(name="models/offline-stub", supported_generation_methods=["generateContent"])],
+        GenerativeModel=_Model,
+        GenerationConfig=lambda **kwargs: kwargs,
+    )
+    os.environ["GOOGLE_API_KEY"] = "offline-stub"
+
+# --- Concurrent AppTest sessions ---
+
+# share_runtime_across_sessions() patches Streamlit internals; these are the
+# (major, minor) versions it was checked against, inclusive
+STREAMLIT_TESTED = ((1, 66), (1, 66))
+
+def streamlit_version_error() -> str:
+    """Why the installed Streamlit can't be load-tested, or "" if its version was tested."""
+    import streamlit
+    try:
+        version = tuple(int(p) for p in streamlit.__version__.split(".")[:2])
+    except ValueError:
+        version = None
+    lo, hi = STREAMLIT_TESTED
+    if version is not None and lo <= version <= hi:
+        return ""
+    tested = ".".join(map(str, lo)) + ("" if lo == hi else " to " + ".".join(map(str, hi)))
+    return (f"the load test patches Streamlit internals and was tested with Streamlit {tested}.x, "
+            f"not {streamlit.__version__}; install a tested version or re-check "
+            f"share_runtime_across_sessions() and update STREAMLIT_TESTED")
+
+def share_runtime_across_sessions():
+    """
+    AppTest installs a mock Runtime singleton for each script run and clears it
+    when the run ends, so with sessions running concurrently one session's
+    script can find no runtime at all. The mocks are interchangeable, so fall
+    back to the last one seen instead of failing. The compiled script is
+    shared too.
+    """
+    from streamlit.runtime.runtime import Runtime
+    last = [None]
+
+    def instance(cls):
+        inst = cls._instance or last[0]
+        if inst is None:
+            raise RuntimeError("Runtime hasn't been created!")
+        last[0] = inst
+        return inst
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: (cls._instance or last[0]) is not None)
+
+    # A server compiles the script once for all sessions, AppTest once per
+    # run; share one cache (compiling concurrently also trips up ast.parse).
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+    shared = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: shared
+
+# --- Recording ---
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, List[str]] = {}
+
+    def step(self, name: str, fn: Callable[[], None]) -> bool:
+        """Times one step; a failed check or an exception in the app counts as an error and ends the flow."""
+        start = time.perf_counter()
+        error = None
+        try:
+            fn()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies.setdefault(name, []).append(elapsed)
+            if error:
+                self.errors.setdefault(name, []).append(error)
+        return error is None
+
+# --- Flows ---
+
+def _check(at):
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+def _button(at, label: str):
+    for b in at.button:
+        if b.label == label:
+            return b
+    raise LookupError(f"no button {label!r}")
+
+def _login(at, username: str, password: str):
+    at.text_input[0].input(username)
+    at.text_input[1].input(password)
+    _button(at, "Log In").click().run()
+    _check(at)
+    if not at.session_state["logged_in"]:
+        raise AssertionError("login failed")
+
+def teacher_flow(at, rec: Recorder, think: float):
+    def open_app():
+        at.run(); _check(at)
+
+    def open_create():
+        at.button(key="nav_create").click().run(); _check(at)
+
+    def generate_passage():
+        _button(at, "Generate Passage").click().run(); _check(at)
+        if not at.session_state["gen_result"] or at.session_state["gen_result"].startswith("(Local fallback"):
+            raise AssertionError("no passage from the (stubbed) model")
+
+    def to_editor():
+        _button(at, "Create Quiz & Go to Editor").click().run(); _check(at)
+
+    def generate_questions():
+        _button(at, "Generate Questions").click().run(); _check(at)
+        if not at.session_state["questions"]:
+            raise AssertionError("no questions generated")
+
+    def edit_question():
+        q = at.session_state["questions"][0]
+        at.text_area(key=f"prompt_{q.id}").input(q.prompt + " (edited)").run(); _check(at)
+
+    def build_pdfs():
+        at.button(key="prepare_pdfs").click().run(); _check(at)
+        built = at.session_state["export_pdfs"]
+        if not (built["quiz"].startswith(b"%PDF") and built["answer_key"].startswith(b"%PDF")):
+            raise AssertionError("PDFs not built")
+
+    def logout():
+        at.button(key="teacher_logout").click().run(); _check(at)
+
+    steps = [open_app, lambda: _login(at, *TEACHER), open_create, generate_passage, to_editor,
+             generate_questions, edit_question, build_pdfs, logout]
+    for name, fn in zip(TEACHER_STEPS, steps):
+        if not rec.step(name, fn):
+            return
+        time.sleep(think)
+
+def student_flow(at, rec: Recorder, think: float, account):
+    def open_app():
+        at.run(); _check(at)
+
+    def login_and_load():
+        _login(at, *account)
+        if not any(k.startswith("ans_") for k in (w.key or "" for w in at.text_input)) and not at.radio:
+            raise AssertionError("no assigned quiz shown")
+
+    def submit():
+        for r in at.radio:
+            if r.key and r.key.startswith("ans_"):
+                r.set_value(r.options[0])
+        for t in at.text_input:
+            if t.key and t.key.startswith("ans_"):
+                t.input("steady effort")
+        _button(at, "Submit Quiz and Get Instant Feedback").click().run(); _check(at)
+        if not any(s.value.startswith("Score:") for s in at.success):
+            raise AssertionError("no score shown")
+
+    def logout():
+        at.button(key="student_logout").click().run(); _check(at)
+
+    for name, fn in zip(STUDENT_STEPS, [open_app, login_and_load, submit, logout]):
+        if not rec.step(name, fn):
+            return
+        time.sleep(think)
+
+# --- Runner ---
+
+def _peak_rss_mib() -> float:
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+def _setup(passage: str):
+    """Loads the model and assigns a quiz to the students' class, outside the measured run."""
+    from rca.assignments import publish_quiz
+    from rca.qg import generate_questions
+    publish_quiz(CLASS_NAME, passage, generate_questions(passage, n=6), published_by="load-test")
+
+def run(teachers: int, students: int, iterations: int, think: float, timeout: float, trace: bool) -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    rec = Recorder()
+    sessions = [("teacher", i) for i in range(teachers)] + [("student", i) for i in range(students)]
+    barrier = threading.Barrier(len(sessions))
+
+    def session(kind: str, i: int):
+        barrier.wait()
+        for _ in range(iterations):
+            at = AppTest.from_file(APP_PATH, default_timeout=timeout)  # a fresh browser session
+            if kind == "teacher":
+                teacher_flow(at, rec, think)
+            else:
+                student_flow(at, rec, think, STUDENTS[i % len(STUDENTS)])
+
+    threads = [threading.Thread(target=session, args=s, name=f"{s[0]}-{s[1]}") for s in sessions]
+    rss_start = _peak_rss_mib()
+    if trace:
+        tracemalloc.start()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    traced_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024) if trace else None
+    if trace:
+        tracemalloc.stop()
+
+    steps = {}
+    for name in TEACHER_STEPS + [s for s in STUDENT_STEPS if s not in TEACHER_STEPS]:
+        values = rec.latencies.get(name, [])
+        if values:
+            steps[name] = {"count": len(values), "errors": len(rec.errors.get(name, [])),
+                           **{f"p{p}_ms": percentile(values, p) * 1000 for p in (50, 90, 95, 99)},
+                           "max_ms": max(values) * 1000}
+    return {
+        "sessions": {"teachers": teachers, "students": students, "iterations": iterations},
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "cpu_util": cpu / wall if wall else 0.0,
+        "peak_rss_mib": _peak_rss_mib(),
+        "rss_at_start_mib": rss_start,
+        "traced_peak_mib": traced_peak,
+        "steps": steps,
+        "errors": {k: sorted(set(v))[:5] for k, v in rec.errors.items()},
+    }
+
+def print_report(result: dict):
+    s = result["sessions"]
+    print(f"sessions     {s['teachers']} teachers + {s['students']} students, {s['iterations']} iteration(s) each")
+    print(f"wall         {result['wall_s']:.1f}s")
+    print(f"cpu          {result['cpu_s']:.1f}s ({result['cpu_util']:.2f} cores busy on average)")
+    print(f"peak rss     {result['peak_rss_mib']:.0f} MiB (after setup: {result['rss_at_start_mib']:.0f} MiB)")
+    if result["traced_peak_mib"] is not None:
+        print(f"traced peak  {result['traced_peak_mib']:.1f} MiB (Python allocations during the run)")
+    print()
+    print(f"{'step':<22}{'n':>5}{'err':>5}{'p50 ms':>10}{'p90 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, st in result["steps"].items():
+        print(f"{name:<22}{st['count']:>5}{st['errors']:>5}{st['p50_ms']:>10.1f}{st['p90_ms']:>10.1f}"
+              f"{st['p95_ms']:>10.1f}{st['p99_ms']:>10.1f}{st['max_ms']:>10.1f}")
+    for name, msgs in result["errors"].items():
+        for msg in msgs:
+            print(f"error in {name}: {msg}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the Streamlit app")
+    parser.add_argument("--teachers", type=int, default=4)
+    parser.add_argument("--students", type=int, default=12)
+    parser.add_argument("--iterations", type=int, default=1, help="flows per session")
+    parser.add_argument("--think", type=float, default=0.0, help="seconds between steps")
+    parser.add_argument("--gemini-latency", type=float, default=1.0, help="stubbed Gemini response time (s)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per script run (s)")
+    parser.add_argument("--tracemalloc", action="store_true", help="also trace Python allocations (slower)")
+    parser.add_argument("--data-dir", default=None, help="keep the database and parse cache here")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args(argv)
+    error = streamlit_version_error()
+    if error:
+        parser.error(error)
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="rca-load-")
+    os.environ["RCA_DB_PATH"] = os.path.join(data_dir, "rca.sqlite3")
+    os.environ["RCA_PARSE_DIR"] = os.path.join(data_dir, "parses")
+    os.chdir(ROOT)  # the app reads data/ and assets/ relative to the working directory
+    try:
+        install_gemini_stub(args.gemini_latency)
+        share_runtime_across_sessions()
+        # session threads aren't Streamlit script threads; their "missing ScriptRunContext" warnings are noise
+        logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").setLevel(logging.ERROR)
+        _setup(_samples()[0])
+        result = run(args.teachers, args.students, args.iterations, args.think, args.timeout, args.tracemalloc)
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return 1 if result["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
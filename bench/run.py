@@ -0,0 +1,277 @@
+# bench/run.py
+"""
+Benchmark suite for the core pipeline.
+
+    python bench/run.py                      # run and compare against bench/baseline.json
+    python bench/run.py --save-baseline      # run and record the current numbers as the baseline
+    python bench/run.py -k pdf --threshold 0.15
+
+Each case is timed for --min-time seconds (best of three rounds), then
+its peak Python memory is measured in a separate tracemalloc'd call. A case
+fails the run when its ops/sec drops by more than --threshold (default 25%)
+against the stored baseline; so does a case that raises, and a baseline
+case that no longer produces a result. The corpus is fixed: the bundled sample
+passages plus synthetic long passages built from them with a fixed seed.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASELINE_PATH = os.path.join(ROOT, "bench", "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_TIME = 1.0
+SEED = 1234
+
+# --- Fixed corpus ---
+
+def load_samples() -> List[str]:
+    with open(os.path.join(ROOT, "data", "sample_passages.json"), "r", encoding="utf-8") as f:
+        return [s["text"] for s in json.load(f)]
+
+def synthetic_passage(n_words: int, seed: int = SEED) -> str:
+    """Long passage made of shuffled sample sentences, deterministic for a given size and seed."""
+    rng = random.Random(seed)
+    sents = [s.strip() + "." for p in load_samples() for s in p.split(".") if s.strip()]
+    out, count = [], 0
+    while count < n_words:
+        s = rng.choice(sents)
+        out.append(s)
+        count += len(s.split())
+    return " ".join(out)
+
+def sample_questions(passage: str, n: int = 12) -> List[Dict]:
+    """Fixed questions for the report / PDF cases, so they don't depend on the spaCy model."""
+    sents = [s.strip() + "." for s in passage.split(".") if s.strip()]
+    questions = []
+    for i in range(n):
+        sent = sents[i % len(sents)]
+        words = sent.split()
+        answer = words[len(words) // 2].strip(".,")
+        if i % 2:
+            questions.append({"id": f"q{i+1}", "qtype": "wh_mcq",
+                              "prompt": f"Who is missing in the sentence: {sent.replace(answer, '____', 1)}",
+                              "options": [answer, "N/A", "Unknown", "Not stated"],
+                              "correct_answer": answer, "evidence": sent})
+        else:
+            questions.append({"id": f"q{i+1}", "qtype": "cloze",
+                              "prompt": f"Fill in the blank: {sent.replace(answer, '____', 1)}",
+                              "options": [], "correct_answer": answer, "evidence": sent})
+    return questions
+
+def sample_answers(questions: List[Dict]) -> Dict[str, str]:
+    return {q["id"]: (q["correct_answer"] if i % 3 else "wrong") for i, q in enumerate(questions)}
+
+def expect_questions(questions: list, n: int) -> list:
+    """Fails the case when a quiz comes back short (e.g. dedup rejecting valid questions)."""
+    if len(questions) != n:
+        raise AssertionError(f"expected {n} questions, got {len(questions)}")
+    return questions
+
+# --- Cases ---
+
+CASES: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+def case(name: str):
+    """Registers a setup function returning the zero-argument callable to time."""
+    def deco(setup):
+        CASES[name] = setup
+        return setup
+    return deco
+
+SHORT = load_samples()[0]
+LONG = synthetic_passage(2000)
+
+# Parsing is part of the qg / key-sentence cases: cached=False keeps the parse
+# store from turning every call after the warm-up into a lookup.
+
+@case("qg.generate_questions[short]")
+def _():
+    from rca.qg import generate_questions
+    return lambda: (random.seed(SEED), expect_questions(generate_questions(SHORT, n=6, cached=False), 6))
+
+@case("qg.generate_questions[2k words]")
+def _():
+    from rca.qg import generate_questions
+    return lambda: (random.seed(SEED), expect_questions(generate_questions(LONG, n=12, cached=False), 12))
+
+@case("qg.generate_questions[samples, n=8]")
+def _():
+    from rca.qg import generate_questions
+    samples = load_samples()
+    return lambda: (random.seed(SEED), [expect_questions(generate_questions(p, n=8, cached=False), 8) for p in samples])
+
+@case("utils.pick_key_sentences[short]")
+def _():
+    from rca.utils import pick_key_sentences
+    return lambda: pick_key_sentences(SHORT, k=8, cached=False)
+
+@case("utils.pick_key_sentences[2k words]")
+def _():
+    from rca.utils import pick_key_sentences
+    return lambda: pick_key_sentences(LONG, k=24, cached=False)
+
+@case("utils._rank_sentences[5k words, parsed]")
+def _():
+    from rca.nlp import get_nlp
+    from rca.utils import _rank_sentences
+    doc = get_nlp()(synthetic_passage(5000))
+    return lambda: _rank_sentences(doc, 24)
+
+@case("utils._rank_sentences[50k words, parsed]")
+def _():
+    from rca.nlp import get_nlp
+    from rca.utils import _rank_sentences
+    doc = get_nlp()(synthetic_passage(50000))
+    return lambda: _rank_sentences(doc, 24)
+
+@case("parse_store.parse[2k words, from disk]")
+def _():
+    from rca import parse_store
+    parse_store.parse(LONG)
+    return lambda: (parse_store.clear_memory(), parse_store.parse(LONG))
+
+@case("longdoc.generate_long_document_quiz[20k words]")
+def _():
+    from rca.longdoc import generate_long_document_quiz
+    chapter = "\n\n".join(f"Chapter {i}\n\n" + synthetic_passage(4000, seed=SEED + i) for i in range(1, 6))
+    return lambda: (random.seed(SEED), generate_long_document_quiz(chapter, chapter_questions=12))
+
+@case("grading.grade_short_answer")
+def _():
+    from rca.grading import grade_short_answer
+    return lambda: grade_short_answer("the hares were sprinting quickly", "The hare sprinted quickly")
+
+@case("report.build_text_report")
+def _():
+    from rca.report import build_text_report
+    qs = sample_questions(SHORT)
+    ans = sample_answers(qs)
+    return lambda: build_text_report(SHORT, qs, ans, student_name="Test Student")
+
+@case("report.build_html_report")
+def _():
+    from rca.report import build_html_report
+    qs = sample_questions(SHORT)
+    ans = sample_answers(qs)
+    return lambda: build_html_report(SHORT, qs, ans, student_name="Test Student")
+
+@case("report.write_class_report_zip[100 students]")
+def _():
+    import io
+    from rca.report import write_class_report_zip
+    qs = sample_questions(SHORT)
+    ans = sample_answers(qs)
+    return lambda: write_class_report_zip(io.BytesIO(), SHORT, qs, ((f"Student {i}", ans) for i in range(100)))
+
+@case("pdf.build_quiz_pdf")
+def _():
+    from rca.page_reading_comp import build_quiz_pdf
+    qs = sample_questions(SHORT)
+    return lambda: build_quiz_pdf(SHORT, qs)
+
+@case("pdf.build_answer_key_pdf")
+def _():
+    from rca.page_reading_comp import build_answer_key_pdf
+    qs = sample_questions(SHORT)
+    return lambda: build_answer_key_pdf(SHORT, qs)
+
+# --- Runner ---
+
+def measure(fn: Callable[[], object], min_time: float, rounds: int = 3) -> Dict[str, float]:
+    """Best of `rounds` timing rounds (least disturbed by noise), then one traced call for peak memory."""
+    fn()  # warm-up (model load, imports, caches)
+    gc.collect()
+    best = 0.0
+    for _ in range(rounds):
+        calls, start = 0, time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time / rounds and calls >= 3:
+                break
+        best = max(best, calls / elapsed)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ops_per_sec": best, "mean_ms": 1000.0 / best, "peak_kib": peak / 1024}
+
+def load_baseline(path: str) -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("results", {})
+
+def save_baseline(path: str, results: Dict[str, Dict[str, float]]):
+    meta = {"python": platform.python_version(), "machine": platform.machine(), "saved_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2, sort_keys=True)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="RCA benchmark suite")
+    parser.add_argument("-k", "--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME, help="seconds per case")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed ops/sec drop vs. baseline before failing (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.baseline)
+    results, regressions, errors = {}, [], []
+    print(f"{'case':<46} {'ops/sec':>10} {'mean ms':>10} {'peak KiB':>10} {'vs base':>9}")
+    for name, setup in CASES.items():
+        if args.filter not in name:
+            continue
+        try:
+            r = measure(setup(), args.min_time)
+        except Exception as e:
+            print(f"{name:<46} ERROR {type(e).__name__}: {e}")
+            errors.append(name)
+            continue
+        results[name] = r
+        change = ""
+        base = baseline.get(name)
+        if base:
+            delta = r["ops_per_sec"] / base["ops_per_sec"] - 1.0
+            change = f"{delta:+.0%}"
+            if delta < -args.threshold:
+                regressions.append(name)
+                change += " !"
+        print(f"{name:<46} {r['ops_per_sec']:>10.1f} {r['mean_ms']:>10.2f} {r['peak_kib']:>10.0f} {change:>9}")
+
+    # baseline cases that were selected but gave no result (removed or renamed)
+    missing = [name for name in baseline if args.filter in name and name not in results and name not in errors]
+
+    failed = False
+    if errors:
+        print(f"\n{len(errors)} case(s) failed: {', '.join(errors)}")
+        failed = True
+    if args.save_baseline:
+        merged = dict(baseline)
+        merged.update(results)
+        save_baseline(args.baseline, merged)
+        print(f"Baseline saved to {args.baseline}")
+        return 1 if failed else 0
+    if missing:
+        print(f"\n{len(missing)} baseline case(s) missing from this run: {', '.join(missing)}")
+        failed = True
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
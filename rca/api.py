@@ -0,0 +1,271 @@
+# rca/api.py
+"""
+Headless JSON API for LMS integrations.
+
+    python -m rca.api --port 8000 --workers 4
+
+Endpoints (POST, JSON body -> JSON response):
+  /questions            {"passage": str, "n": int}
+  /grade/mcq            {"user_answer": str, "correct_answer": str}
+  /grade/short_answer   {"user_answer": str, "correct_answer": str}
+  /pdf/quiz             {"passage": str, "questions": [...]}   -> {"pdf_base64": ...}
+  /pdf/answer_key       {"passage": str, "questions": [...]}   -> {"pdf_base64": ...}
+  /passage              {"grade": str, "level": str, "length": str, "keywords": str, "learning_outcomes": str}
+GET /health reports pool size and queue depth.
+
+CPU-bound work runs in a process pool; each worker loads spaCy once at
+start-up and keeps it warm. At most `max_pending` jobs may be queued or
+running; beyond that the server answers 503 with Retry-After instead of
+letting requests pile up. A job keeps its slot until it finishes, even after
+its request timed out. If a worker process dies, the pool is replaced and
+the request gets a 503.
+"""
+import argparse
+import base64
+import json
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+
+from .grading import grade_mcq
+from .models import as_questions
+
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_PER_WORKER = 4
+JOB_TIMEOUT = 120
+MAX_BODY_BYTES = 2 * 1024 * 1024
+MAX_QUESTIONS = 50
+
+# --- Worker-side jobs (top-level so they pickle) ---
+
+def _warm_worker():
+    """
+    Pool initializer: load the spaCy model once per worker process.
+    Best-effort: a missing model must not break the pool, since the PDF
+    endpoints don't need it (NLP endpoints will report the error instead).
+    """
+    from .nlp import get_nlp
+    try:
+        get_nlp()
+    except Exception as e:
+        print(f"Worker warm-up failed: {e}")
+
+def _job_questions(passage: str, n: int = 6):
+    from .qg import generate_questions
+    # one-off passages from other systems: don't fill the parse store with them
+    return {"questions": [q.to_dict() for q in generate_questions(passage, n=n, cached=False)]}
+
+def _job_short_answer(user_answer: str, correct_answer: str):
+    from .grading import grade_short_answer
+    return grade_short_answer(user_answer, correct_answer)
+
+def _job_quiz_pdf(passage: str, questions: list):
+    from .page_reading_comp import build_quiz_pdf
+    return {"pdf_base64": base64.b64encode(build_quiz_pdf(passage, questions).getvalue()).decode("ascii")}
+
+def _job_answer_key_pdf(passage: str, questions: list):
+    from .page_reading_comp import build_answer_key_pdf
+    return {"pdf_base64": base64.b64encode(build_answer_key_pdf(passage, questions).getvalue()).decode("ascii")}
+
+def _job_passage(grade: str, level: str, length: str, keywords: str = "", learning_outcomes: str = ""):
+    from .gemini_client import generate_passage
+    return {"passage": generate_passage(grade=grade, level=level, length=length,
+                                        keywords=keywords, learning_outcomes=learning_outcomes)}
+
+# path -> (callable, required fields, optional fields, run in pool?)
+ROUTES: Dict[str, tuple] = {
+    "/questions": (_job_questions, ("passage",), ("n",), True),
+    "/grade/mcq": (grade_mcq, ("user_answer", "correct_answer"), (), False),
+    "/grade/short_answer": (_job_short_answer, ("user_answer", "correct_answer"), (), True),
+    "/pdf/quiz": (_job_quiz_pdf, ("passage", "questions"), (), True),
+    "/pdf/answer_key": (_job_answer_key_pdf, ("passage", "questions"), (), True),
+    "/passage": (_job_passage, ("grade", "level", "length"), ("keywords", "learning_outcomes"), True),
+}
+
+# field -> expected JSON type (every route uses the same names)
+FIELD_TYPES: Dict[str, type] = {
+    "passage": str, "n": int, "user_answer": str, "correct_answer": str, "questions": list,
+    "grade": str, "level": str, "length": str, "keywords": str, "learning_outcomes": str,
+}
+_TYPE_NAMES = {str: "a string", int: "an integer", list: "a list"}
+
+def validate(kwargs: Dict[str, Any]) -> Optional[str]:
+    """Error message for the first invalid field, or None when the request is well-formed."""
+    for k, v in kwargs.items():
+        expected = FIELD_TYPES[k]
+        if not isinstance(v, expected) or isinstance(v, bool):
+            return f"'{k}' must be {_TYPE_NAMES[expected]}"
+    if "n" in kwargs and not 1 <= kwargs["n"] <= MAX_QUESTIONS:
+        return f"'n' must be between 1 and {MAX_QUESTIONS}"
+    if "questions" in kwargs:
+        if not all(isinstance(q, dict) for q in kwargs["questions"]):
+            return "'questions' must be a list of objects"
+        try:
+            as_questions(kwargs["questions"])
+        except (TypeError, ValueError) as e:
+            return f"Invalid question: {e}"
+    return None
+
+# --- Dispatcher ---
+
+class QueueFull(Exception):
+    pass
+
+class WorkerCrashed(Exception):
+    pass
+
+class Dispatcher:
+    """Owns the process pool and enforces the pending-job limit."""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_pending: Optional[int] = None):
+        self.workers = workers
+        self.max_pending = max_pending or workers * DEFAULT_QUEUE_PER_WORKER
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def _replace_pool(self, broken: ProcessPoolExecutor):
+        """Swaps in a fresh pool after a worker died (once, however many requests saw it)."""
+        with self._lock:
+            if self.pool is broken:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, fn: Callable, kwargs: Dict[str, Any], in_pool: bool = True) -> Any:
+        if not in_pool:
+            return fn(**kwargs)
+        if not self._slots.acquire(blocking=False):
+            raise QueueFull()
+        with self._lock:
+            self._pending += 1
+            pool = self.pool
+        try:
+            future = pool.submit(fn, **kwargs)
+        except BrokenProcessPool:
+            self._release()
+            self._replace_pool(pool)
+            raise WorkerCrashed()
+        # the slot is held until the job is done, not until the request gives up on it
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=JOB_TIMEOUT)
+        except BrokenProcessPool:
+            self._replace_pool(pool)
+            raise WorkerCrashed()
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+# --- HTTP layer ---
+
+def _make_handler(dispatcher: Dispatcher):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            pass  # keep stdout quiet under load
+
+        def _reply(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self._reply(404, {"error": "Not found"})
+            self._reply(200, {"status": "ok", "workers": dispatcher.workers,
+                              "pending": dispatcher.pending, "max_pending": dispatcher.max_pending})
+
+        def do_POST(self):
+            # replies sent before the body is read close the connection, so the
+            # unread bytes can't be taken for the next keep-alive request
+            close = {"Connection": "close"}
+            route = ROUTES.get(self.path)
+            if route is None:
+                return self._reply(404, {"error": "Not found"}, close)
+            fn, required, optional, in_pool = route
+
+            try:
+                length = int(self.headers.get("Content-Length", ""))
+            except ValueError:
+                length = -1
+            if length < 0:
+                return self._reply(400, {"error": "Content-Length must be a non-negative integer"}, close)
+            if length > MAX_BODY_BYTES:
+                return self._reply(413, {"error": "Request body too large"}, close)
+            try:
+                data = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                return self._reply(400, {"error": "Body must be JSON"})
+            if not isinstance(data, dict):
+                return self._reply(400, {"error": "Body must be a JSON object"})
+            missing = [k for k in required if k not in data]
+            if missing:
+                return self._reply(400, {"error": f"Missing fields: {', '.join(missing)}"})
+            kwargs = {k: data[k] for k in required + optional if k in data}
+            error = validate(kwargs)
+            if error:
+                return self._reply(400, {"error": error})
+
+            try:
+                result = dispatcher.run(fn, kwargs, in_pool=in_pool)
+            except QueueFull:
+                return self._reply(503, {"error": "Server busy, retry later"}, {"Retry-After": "1"})
+            except WorkerCrashed:
+                return self._reply(503, {"error": "Worker crashed, retry later"}, {"Retry-After": "1"})
+            except FutureTimeout:
+                return self._reply(504, {"error": "Job timed out"})
+            except Exception as e:
+                return self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+            self._reply(200, result)
+
+    return Handler
+
+def make_server(host: str = "127.0.0.1", port: int = 8000, workers: int = DEFAULT_WORKERS,
+                max_pending: Optional[int] = None):
+    """Returns (server, dispatcher); call server.serve_forever() to start."""
+    dispatcher = Dispatcher(workers=workers, max_pending=max_pending)
+    server = ThreadingHTTPServer((host, port), _make_handler(dispatcher))
+    server.daemon_threads = True
+    return server, dispatcher
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Reading Comprehension Assistant API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help=f"queued + running jobs before 503 (default: workers x {DEFAULT_QUEUE_PER_WORKER})")
+    args = parser.parse_args(argv)
+
+    server, dispatcher = make_server(args.host, args.port, args.workers, args.max_pending)
+    print(f"RCA API listening on http://{args.host}:{args.port} ({args.workers} workers, "
+          f"max {dispatcher.max_pending} pending)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        dispatcher.shutdown()
+
+if __name__ == "__main__":
+    main()
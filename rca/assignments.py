@@ -0,0 +1,124 @@
+# rca/assignments.py
+"""
+Quiz assignments: a teacher publishes a quiz to a class, students read it.
+
+Quizzes and assignments are stored in SQLite (rca.db). Reads go through a
+process-wide read-through cache: the class -> quiz id mapping is cached here
+and the Quiz itself lives in the shared registry (rca.models), so when a
+whole class logs in at once the quiz is loaded from the database once, not
+once per student. Publishing invalidates the class's cache entry.
+"""
+import json
+import threading
+import time
+from typing import Dict, Optional
+
+from .db import get_connection
+from .dedup import index_quiz
+from .models import Quiz, as_questions, get_quiz, register_quiz
+from .perf import timed
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quizzes (
+    id TEXT PRIMARY KEY,
+    passage TEXT NOT NULL,
+    questions_json TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS assignments (
+    class_name TEXT PRIMARY KEY,
+    quiz_id TEXT NOT NULL REFERENCES quizzes(id),
+    published_by TEXT,
+    published_at REAL NOT NULL
+);
+"""
+
+def _conn():
+    return get_connection(schema=_SCHEMA)
+
+# --- Read-through cache ---
+
+_cache_lock = threading.Lock()
+_class_locks: Dict[str, threading.Lock] = {}
+_assigned: Dict[str, Optional[str]] = {}  # class_name -> quiz_id (None = nothing assigned)
+_generation: Dict[str, int] = {}  # bumped on publish so an in-flight stale read isn't cached
+
+def _class_lock(class_name: str) -> threading.Lock:
+    with _cache_lock:
+        lock = _class_locks.get(class_name)
+        if lock is None:
+            lock = _class_locks[class_name] = threading.Lock()
+        return lock
+
+def invalidate(class_name: Optional[str] = None):
+    """Drops the cached assignment for one class (or all classes)."""
+    with _cache_lock:
+        for name in ([class_name] if class_name is not None else list(_assigned)):
+            _assigned.pop(name, None)
+            _generation[name] = _generation.get(name, 0) + 1
+
+@timed("assignments.load_quiz")
+def _load_quiz_from_db(quiz_id: str) -> Optional[Quiz]:
+    row = _conn().execute("SELECT passage, questions_json FROM quizzes WHERE id = ?", (quiz_id,)).fetchone()
+    if row is None:
+        return None
+    return register_quiz(row["passage"], json.loads(row["questions_json"]))
+
+def load_quiz(quiz_id: str) -> Optional[Quiz]:
+    """Shared Quiz by id: registry first, database on a miss."""
+    return get_quiz(quiz_id) or _load_quiz_from_db(quiz_id)
+
+def get_assigned_quiz(class_name: str) -> Optional[Quiz]:
+    """The quiz currently assigned to a class, or None."""
+    with _cache_lock:
+        hit = class_name in _assigned
+        quiz_id = _assigned.get(class_name)
+    if not hit:
+        # single-flight: concurrent students of the same class wait for one lookup
+        with _class_lock(class_name):
+            with _cache_lock:
+                hit = class_name in _assigned
+                quiz_id = _assigned.get(class_name)
+                generation = _generation.get(class_name, 0)
+            if not hit:
+                row = _conn().execute("SELECT quiz_id FROM assignments WHERE class_name = ?",
+                                      (class_name,)).fetchone()
+                quiz_id = row["quiz_id"] if row else None
+                if quiz_id:
+                    load_quiz(quiz_id)  # warm the registry while holding the class lock
+                with _cache_lock:
+                    if _generation.get(class_name, 0) == generation:
+                        _assigned[class_name] = quiz_id
+    return load_quiz(quiz_id) if quiz_id else None
+
+# --- Publishing ---
+
+def publish_quiz(class_name: str, passage: str, questions, published_by: str = "") -> Quiz:
+    """
+    Stores the quiz (if new), assigns it to the class, invalidates the class's
+    cache entry and adds the questions to the near-duplicate question bank.
+    """
+    class_name = class_name.strip()
+    if not class_name:
+        raise ValueError("Class name is required.")
+    quiz = register_quiz(passage, as_questions(questions))
+    conn = _conn()
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO quizzes (id, passage, questions_json, created_at) VALUES (?, ?, ?, ?)",
+            (quiz.id, quiz.passage, json.dumps([q.to_dict() for q in quiz.questions]), time.time()),
+        )
+        conn.execute(
+            "INSERT INTO assignments (class_name, quiz_id, published_by, published_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(class_name) DO UPDATE SET quiz_id = excluded.quiz_id, "
+            "published_by = excluded.published_by, published_at = excluded.published_at",
+            (class_name, quiz.id, published_by, time.time()),
+        )
+    invalidate(class_name)
+    index_quiz(quiz, published_by)
+    return quiz
+
+def list_assignments() -> Dict[str, str]:
+    """class_name -> quiz_id for every class with an assigned quiz."""
+    rows = _conn().execute("SELECT class_name, quiz_id FROM assignments ORDER BY class_name").fetchall()
+    return {r["class_name"]: r["quiz_id"] for r in rows}
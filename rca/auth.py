@@ -1,7 +1,9 @@
 import streamlit as st
+from rca import users
 
-# --- User Database ---
-# This is mock data. In a real app, this would be in a secure database.
+# --- Demo Accounts ---
+# Seeded (hashed) into the user directory (rca/users.py) on first run only.
+# Real rosters are loaded with `python -m rca.users import roster.csv`.
 USER_CREDENTIALS = {
     "teacher_sam": {
         "password": "securepass",
@@ -11,12 +13,14 @@ USER_CREDENTIALS = {
     "student_test1": {
         "password": "securepass",
         "role": "Student",
-        "name": "Test Student 1"
+        "name": "Test Student 1",
+        "class_name": "Class 1"
     },
     "student_test2": {
         "password": "securepass",
         "role": "Student",
-        "name": "Test Student 2"
+        "name": "Test Student 2",
+        "class_name": "Class 1"
     }
 }
 
@@ -32,6 +36,8 @@ def init_session_state():
         st.session_state.role = None
     if "auth_error" not in st.session_state:
         st.session_state.auth_error = False
+    if "class_name" not in st.session_state:
+        st.session_state.class_name = None
     
     # This tracks which sub-page the teacher is on.
     if "teacher_view" not in st.session_state:
@@ -49,10 +55,9 @@ def check_credentials(username, password):
     # Strip whitespace to prevent login failures from typos
     clean_username = username.strip() 
     
-    if clean_username in USER_CREDENTIALS:
-        if USER_CREDENTIALS[clean_username]["password"] == password:
-            # --- FIX: Returns the username string, NOT True ---
-            return clean_username  
+    if clean_username and users.authenticate(clean_username, password):
+        # --- FIX: Returns the username string, NOT True ---
+        return clean_username  
     return False # Return False if any check fails
 
 def logout():
@@ -61,6 +66,9 @@ def logout():
     st.session_state.username = None
     st.session_state.role = None
     st.session_state.auth_error = False
+    st.session_state.class_name = None
+    st.session_state.pop("answers", None)
+    st.session_state.pop("submitted_quiz_id", None)
     
     # Reset the teacher view on logout
     st.session_state.teacher_view = "dashboard"
\ No newline at end of file
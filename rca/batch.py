@@ -0,0 +1,133 @@
+# rca/batch.py
+"""
+Offline batch question generation for a directory of passages.
+
+    python -m rca.batch input_dir/ --out results.jsonl --pdf out/
+
+Each .txt/.md file is one passage. Results are appended to the JSON-lines
+file as soon as each passage is done, so an interrupted run can simply be
+started again: passages whose content hash is already in the output are
+skipped. Files are read one at a time, so memory stays flat however large
+the corpus is.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Iterator, Optional, Set, Tuple
+
+from .utils import text_hash
+
+PASSAGE_EXTS = (".txt", ".md")
+PROGRESS_EVERY = 10
+
+def iter_passages(input_dir: str) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Yields (path, text, error) for every passage file, in a stable order.
+    A file that can't be read or isn't UTF-8 comes with text None and the
+    error, so one bad file doesn't stop the run.
+    """
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.lower().endswith(PASSAGE_EXTS):
+                continue
+            path = os.path.join(root, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read().strip()
+            except (OSError, UnicodeDecodeError) as e:
+                yield path, None, f"{type(e).__name__}: {e}"
+                continue
+            if text:
+                yield path, text, None
+
+def load_done_hashes(out_path: str) -> Set[str]:
+    """Hashes of passages already processed successfully (records with an error are retried)."""
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # a partially written last line from an interrupted run
+            if rec.get("hash") and not rec.get("error"):
+                done.add(rec["hash"])
+    return done
+
+def _pdf_stem(input_dir: str, path: str) -> str:
+    rel = os.path.splitext(os.path.relpath(path, input_dir))[0]
+    return rel.replace(os.sep, "__")
+
+def run_batch(input_dir: str, out_path: str, pdf_dir: Optional[str] = None, n: int = 6) -> dict:
+    from .qg import generate_questions
+    from .page_reading_comp import build_quiz_pdf, build_answer_key_pdf
+
+    done = load_done_hashes(out_path)
+    if pdf_dir:
+        os.makedirs(pdf_dir, exist_ok=True)
+
+    stats = {"processed": 0, "skipped": 0, "failed": 0}
+    start = time.perf_counter()
+    with open(out_path, "a", encoding="utf-8") as out:
+        for path, text, error in iter_passages(input_dir):
+            source = os.path.relpath(path, input_dir)
+            if error:
+                # keyed by path: error records are retried on the next run anyway
+                out.write(json.dumps({"hash": None, "source": source, "error": error}, ensure_ascii=False) + "\n")
+                out.flush()
+                stats["failed"] += 1
+                continue
+            h = text_hash(text)
+            if h in done:
+                stats["skipped"] += 1
+                continue
+
+            rec = {"hash": h, "source": source}
+            try:
+                questions = generate_questions(text, n=n, cached=False)  # each passage is seen once
+                rec["questions"] = [q.to_dict() for q in questions]
+                if pdf_dir:
+                    stem = os.path.join(pdf_dir, _pdf_stem(input_dir, path))
+                    with open(stem + ".quiz.pdf", "wb") as f:
+                        f.write(build_quiz_pdf(text, questions).getvalue())
+                    with open(stem + ".answer_key.pdf", "wb") as f:
+                        f.write(build_answer_key_pdf(text, questions).getvalue())
+                stats["processed"] += 1
+            except Exception as e:
+                rec["error"] = f"{type(e).__name__}: {e}"
+                stats["failed"] += 1
+
+            out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            out.flush()
+            done.add(h)
+
+            if stats["processed"] and stats["processed"] % PROGRESS_EVERY == 0:
+                rate = stats["processed"] / (time.perf_counter() - start)
+                print(f"  {stats['processed']} passages, {rate:.2f} passages/s", file=sys.stderr)
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["passages_per_sec"] = stats["processed"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate questions (and PDFs) for a directory of passages")
+    parser.add_argument("input_dir")
+    parser.add_argument("--out", required=True, help="JSON-lines results file (appended to, resumable)")
+    parser.add_argument("--pdf", default=None, help="directory for quiz / answer-key PDFs")
+    parser.add_argument("-n", "--questions", type=int, default=6, help="questions per passage")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.input_dir):
+        parser.error(f"not a directory: {args.input_dir}")
+
+    stats = run_batch(args.input_dir, args.out, args.pdf, n=args.questions)
+    print(f"Processed {stats['processed']}, skipped {stats['skipped']} (already done), "
+          f"failed {stats['failed']} in {stats['seconds']:.1f}s "
+          f"({stats['passages_per_sec']:.2f} passages/s)")
+
+if __name__ == "__main__":
+    main()
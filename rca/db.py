@@ -0,0 +1,40 @@
+# rca/db.py
+import os
+import sqlite3
+import threading
+
+# SQLite file shared by the assignment store and user directory
+DB_PATH = os.getenv("RCA_DB_PATH", os.path.join("data", "rca.sqlite3"))
+
+_local = threading.local()
+_schema_lock = threading.RLock()
+_schema_ready = set()  # (path, schema) pairs already created
+
+def get_connection(path: str = None, schema: str = None, init=None) -> sqlite3.Connection:
+    """
+    One connection per thread and database file (sqlite3 connections can't be
+    shared across threads; Streamlit runs each session on its own thread).
+    `schema` (CREATE ... IF NOT EXISTS statements) is run once per database
+    file, followed by init(conn) for one-off work such as seeding.
+    """
+    path = path or DB_PATH
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")  # readers don't block the writer
+        conn.execute("PRAGMA foreign_keys=ON")
+        conns[path] = conn
+    if schema and (path, schema) not in _schema_ready:
+        with _schema_lock:
+            if (path, schema) not in _schema_ready:
+                conn.executescript(schema)
+                if init is not None:
+                    init(conn)
+                _schema_ready.add((path, schema))
+    return conn
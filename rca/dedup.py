@@ -0,0 +1,177 @@
+# rca/dedup.py
+"""
+Near-duplicate question detection.
+
+Two questions are near-duplicates when they ask for the same answer from
+(nearly) the same sentence: the answers must match (case and spacing
+aside), and the evidence sentences (prompts when there is no evidence) are
+reduced to word 3-grams, summarised as MinHash signatures and compared by
+estimated Jaccard similarity (>= THRESHOLD). Questions on one sentence
+that ask about different words are different questions.
+
+Candidates are found with LSH banding: the signature is cut into BANDS
+bands and two questions are compared only if some band hashes equal. That
+keeps both the within-quiz filter and the lookup in the question bank
+(every question of every published quiz, stored in SQLite next to the
+quizzes) independent of how many questions there are. The bank is an index
+over the quizzes table.
+"""
+import json
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .db import get_connection
+from .models import Question, Quiz, as_questions
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS  # 16 x 4: pairs above ~0.5 similarity almost always share a band
+SHINGLE = 3
+THRESHOLD = 0.7
+MAX_CANDIDATES = 500  # per lookup, after banding
+
+# --- MinHash ---
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(20240607)  # fixed seed: stored signatures must stay comparable
+_A = _rng.randint(1, _PRIME, NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, NUM_PERM).astype(np.uint64)
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+def _shingles(q: Question) -> List[str]:
+    words = _WORD_RE.findall((q.evidence or q.prompt).lower())
+    if len(words) <= SHINGLE:
+        return [" ".join(words)]
+    return [" ".join(words[i:i + SHINGLE]) for i in range(len(words) - SHINGLE + 1)]
+
+def signature(q: Question) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint32 values) of a question's evidence sentence."""
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in set(_shingles(q))), dtype=np.uint64)
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0).astype(np.uint32)
+
+def answer_key(q: Question) -> str:
+    """The answer as compared between questions: lower-cased, whitespace collapsed."""
+    return " ".join(q.correct_answer.lower().split())
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(sig_a == sig_b)) / NUM_PERM
+
+def band_keys(sig: np.ndarray) -> List[int]:
+    """One integer per band: band number in the high bits, hash of the band's rows in the low 32."""
+    return [(b << 32) | zlib.crc32(sig[b * ROWS:(b + 1) * ROWS].tobytes()) for b in range(BANDS)]
+
+# --- Within a quiz ---
+
+class NearDuplicateFilter:
+    """Accepts questions one at a time, rejecting any that near-duplicates one already accepted."""
+
+    def __init__(self, threshold: float = THRESHOLD):
+        self.threshold = threshold
+        self._sigs: List[np.ndarray] = []
+        self._buckets: Dict[tuple, List[int]] = {}  # (answer, band key) -> accepted question indexes
+
+    def add(self, q: Question) -> bool:
+        sig = signature(q)
+        answer = answer_key(q)
+        keys = [(answer, k) for k in band_keys(sig)]
+        candidates = {i for k in keys for i in self._buckets.get(k, ())}
+        if any(similarity(sig, self._sigs[i]) >= self.threshold for i in candidates):
+            return False
+        idx = len(self._sigs)
+        self._sigs.append(sig)
+        for k in keys:
+            self._buckets.setdefault(k, []).append(idx)
+        return True
+
+def dedupe_questions(questions: Iterable[Question], threshold: float = THRESHOLD) -> List[Question]:
+    """Questions in order, keeping the first of each near-duplicate group."""
+    seen = NearDuplicateFilter(threshold)
+    return [q for q in as_questions(questions) if seen.add(q)]
+
+# --- Question bank ---
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS question_bank (
+    id INTEGER PRIMARY KEY,
+    quiz_id TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    published_by TEXT NOT NULL DEFAULT '',
+    signature BLOB NOT NULL,
+    UNIQUE (quiz_id, question_id)
+);
+CREATE TABLE IF NOT EXISTS question_bank_bands (
+    band_key INTEGER NOT NULL,
+    entry_id INTEGER NOT NULL REFERENCES question_bank(id),
+    PRIMARY KEY (band_key, entry_id)
+) WITHOUT ROWID;
+"""
+
+def _conn():
+    return get_connection(schema=_SCHEMA, init=_backfill)
+
+def _backfill(conn):
+    """Indexes quizzes published before the bank existed (once per database)."""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'quizzes'").fetchone():
+        return
+    # publisher of a quiz still assigned to some class; older ones stay unattributed
+    rows = conn.execute("SELECT q.id, q.questions_json, "
+                        "(SELECT a.published_by FROM assignments a WHERE a.quiz_id = q.id LIMIT 1) AS published_by "
+                        "FROM quizzes q WHERE q.id NOT IN (SELECT DISTINCT quiz_id FROM question_bank)").fetchall()
+    for row in rows:
+        _index(conn, row["id"], as_questions(json.loads(row["questions_json"])), row["published_by"] or "")
+
+def _index(conn, quiz_id: str, questions, published_by: str = "") -> int:
+    added = 0
+    with conn:
+        for q in questions:
+            sig = signature(q)
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO question_bank (quiz_id, question_id, prompt, answer, published_by, signature) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (quiz_id, q.id, q.prompt, answer_key(q), published_by, sig.tobytes()))
+            if cur.rowcount:
+                conn.executemany("INSERT OR IGNORE INTO question_bank_bands (band_key, entry_id) VALUES (?, ?)",
+                                 [(k, cur.lastrowid) for k in band_keys(sig)])
+                added += 1
+    return added
+
+def index_quiz(quiz: Quiz, published_by: str = "") -> int:
+    """Adds a saved quiz's questions to the bank; returns how many were new."""
+    return _index(_conn(), quiz.id, quiz.questions, published_by)
+
+def find_similar(q: Question, threshold: float = THRESHOLD, limit: int = 3,
+                 exclude_published_by: Optional[str] = None) -> List[Dict]:
+    """
+    Saved questions that near-duplicate `q`, most similar first, as dicts with
+    quiz_id, question_id, prompt and similarity. Questions published by
+    `exclude_published_by` (e.g. the teacher's own earlier versions) are
+    skipped. Only questions with the same answer sharing an LSH band with `q`
+    are loaded, those sharing the most bands first, so the cost doesn't grow
+    with the bank.
+    """
+    sig = signature(q)
+    keys = band_keys(sig)
+    where, params = "k.band_key IN ({}) AND b.answer = ?".format(",".join("?" * len(keys))), [*keys, answer_key(q)]
+    if exclude_published_by:
+        where += " AND b.published_by != ?"
+        params.append(exclude_published_by)
+    # candidates sharing more bands are likelier matches, so they're the ones kept under the limit
+    rows = _conn().execute(
+        "SELECT b.quiz_id, b.question_id, b.prompt, b.signature, COUNT(*) AS shared "
+        "FROM question_bank_bands k JOIN question_bank b ON b.id = k.entry_id "
+        f"WHERE {where} GROUP BY b.id ORDER BY shared DESC, b.id LIMIT ?",
+        (*params, MAX_CANDIDATES)).fetchall()
+    matches = []
+    for row in rows:
+        sim = similarity(sig, np.frombuffer(row["signature"], dtype=np.uint32))
+        if sim >= threshold:
+            matches.append({"quiz_id": row["quiz_id"], "question_id": row["question_id"],
+                            "prompt": row["prompt"], "similarity": sim})
+    matches.sort(key=lambda m: -m["similarity"])
+    return matches[:limit]
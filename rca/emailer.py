@@ -1,12 +1,63 @@
 # rca/emailer.py
-import os, ssl, smtplib
-from typing import Optional
+import os, ssl, smtplib, threading, time, queue, itertools
+from collections import deque
+from functools import lru_cache
+from typing import Optional, Dict, List, Any
 from email.message import EmailMessage
 
 def _get_env(name: str, default: Optional[str] = None) -> str:
     v = os.getenv(name, default)
     return v.strip() if isinstance(v, str) else ""
 
+def _smtp_settings() -> Dict[str, Any]:
+    """SMTP connection settings from the environment (see send_email for the variables)."""
+    smtp_user = _get_env("SMTP_USER")
+    return {
+        "user": smtp_user,
+        "password": _get_env("SMTP_PASS"),
+        "server": _get_env("SMTP_SERVER", "smtp.gmail.com"),
+        "port": int(_get_env("SMTP_PORT", "465") or "465"),
+        "use_ssl": _get_env("SMTP_SSL", "1") not in ("0", "false", "no"),
+        "from_email": _get_env("FROM_EMAIL", smtp_user),
+    }
+
+def _build_message(to_email: str, subject: str, body_text: str, body_html: Optional[str],
+                   from_name: str, from_email: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = f"{from_name} <{from_email}>"
+    msg["To"] = to_email
+
+    if body_html:
+        msg.set_content(body_text)
+        msg.add_alternative(body_html, subtype="html")
+    else:
+        msg.set_content(body_text)
+    return msg
+
+def _connect(settings: Dict[str, Any], timeout: float = 30) -> smtplib.SMTP:
+    """
+    Opens and authenticates one SMTP connection (SSL by default, plain/STARTTLS
+    when SMTP_SSL=0). The socket is closed again if the handshake or login fails.
+    """
+    if settings["use_ssl"]:
+        context = ssl.create_default_context()
+        server = smtplib.SMTP_SSL(settings["server"], settings["port"], context=context, timeout=timeout)
+    else:
+        server = smtplib.SMTP(settings["server"], settings["port"], timeout=timeout)
+    try:
+        if not settings["use_ssl"]:
+            server.ehlo()
+            if server.has_extn("starttls"):
+                server.starttls(context=ssl.create_default_context())
+                server.ehlo()
+        if settings["user"] and settings["password"]:
+            server.login(settings["user"], settings["password"])
+    except Exception:
+        server.close()
+        raise
+    return server
+
 def send_email(
     to_email: str,
     subject: str,
@@ -21,34 +72,206 @@ def send_email(
     Optional overrides:
       SMTP_SERVER (default: smtp.gmail.com)
       SMTP_PORT   (default: 465)
+      SMTP_SSL    (default: 1; set 0 for plain SMTP + STARTTLS, e.g. a local test server)
       FROM_EMAIL  (default: SMTP_USER)
     Returns "OK" if sent, or an error string.
+    For many messages, use MailQueue instead (one connection for the whole batch).
     """
-    smtp_user = _get_env("SMTP_USER")
-    smtp_pass = _get_env("SMTP_PASS")
-    smtp_server = _get_env("SMTP_SERVER", "smtp.gmail.com")
-    smtp_port = int(_get_env("SMTP_PORT", "465") or "465")
-    from_email = _get_env("FROM_EMAIL", smtp_user)
+    settings = _smtp_settings()
 
-    if not smtp_user or not smtp_pass:
+    if not settings["user"] or not settings["password"]:
         return "Missing SMTP_USER/SMTP_PASS environment variables."
 
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = f"{from_name} <{from_email}>"
-    msg["To"] = to_email
-
-    if body_html:
-        msg.set_content(body_text)
-        msg.add_alternative(body_html, subtype="html")
-    else:
-        msg.set_content(body_text)
+    msg = _build_message(to_email, subject, body_text, body_html, from_name, settings["from_email"])
 
     try:
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL(smtp_server, smtp_port, context=context, timeout=30) as server:
-            server.login(smtp_user, smtp_pass)
+        with _connect(settings) as server:
             server.send_message(msg)
         return "OK"
     except Exception as e:
         return f"Email error: {e}"
+
+# --- Bulk sending ---
+
+# Errors worth retrying: dropped connections, timeouts and 4xx replies
+_TRANSIENT = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError, OSError)
+
+class _ConnectFailed(Exception):
+    """The queue could not connect or log in; messages are failed without retrying for a while."""
+
+def _is_transient(e: Exception) -> bool:
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        return False
+    if isinstance(e, smtplib.SMTPResponseException):
+        return 400 <= e.smtp_code < 500
+    return isinstance(e, _TRANSIENT)
+
+class MailQueue:
+    """
+    Background sender for bulk email (e.g. a class set of reports).
+
+    submit() returns immediately with a message id; a single worker thread
+    sends queued messages in batches over one authenticated connection,
+    reconnecting and retrying transient failures with backoff. If the server
+    can't be reached or rejects the login, every message taken up in the next
+    `connect_cooldown` seconds fails at once with that error, rather than
+    repeating the handshake for every message (which can get the account
+    locked). Per-message status is available from
+    status()/statuses():
+      "queued" -> "sent" | "retrying" -> "failed"
+    Only the latest `max_finished` sent/failed statuses are kept; older ids
+    report "unknown".
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None, batch_size: int = 20,
+                 max_retries: int = 3, retry_delay: float = 2.0, idle_timeout: float = 30.0,
+                 from_name: str = "Reading Comprehension Assistant", max_finished: int = 1000,
+                 connect_cooldown: float = 60.0):
+        self.settings = settings or _smtp_settings()
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.idle_timeout = idle_timeout
+        self.from_name = from_name
+        self.max_finished = max_finished
+        self.connect_cooldown = connect_cooldown
+        self._connect_error = ""
+        self._connect_error_until = 0.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._finished: "deque[str]" = deque()  # sent/failed ids, oldest first
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._conn: Optional[smtplib.SMTP] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rca-mail-queue", daemon=True)
+        self._thread.start()
+
+    # --- public API ---
+
+    def submit(self, to_email: str, subject: str, body_text: str, body_html: Optional[str] = None) -> str:
+        msg_id = f"m{next(self._ids)}"
+        msg = _build_message(to_email, subject, body_text, body_html, self.from_name, self.settings["from_email"])
+        with self._lock:
+            self._status[msg_id] = {"to": to_email, "status": "queued", "attempts": 0, "error": ""}
+        self._queue.put((msg_id, msg))
+        return msg_id
+
+    def submit_many(self, messages: List[Dict[str, Any]]) -> List[str]:
+        """messages: dicts with to_email, subject, body_text and optional body_html."""
+        return [self.submit(**m) for m in messages]
+
+    def status(self, msg_id: str) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._status.get(msg_id, {"status": "unknown"}))
+
+    def statuses(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {k: dict(v) for k, v in self._status.items()}
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Waits until every submitted message is sent or failed. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def close(self, timeout: Optional[float] = None):
+        self.join(timeout)
+        self._stop.set()
+        self._queue.put(None)  # wake the worker if it is waiting for work
+        self._thread.join(timeout=5)
+
+    # --- worker ---
+
+    def _set(self, msg_id: str, **fields):
+        with self._lock:
+            self._status[msg_id].update(fields)
+            if fields.get("status") in ("sent", "failed"):
+                self._finished.append(msg_id)
+                while len(self._finished) > self.max_finished:
+                    self._status.pop(self._finished.popleft(), None)
+
+    def _disconnect(self):
+        if self._conn is not None:
+            try:
+                self._conn.quit()
+            except Exception:
+                pass
+            self._conn = None
+
+    def _next_batch(self) -> list:
+        try:
+            batch = [self._queue.get(timeout=self.idle_timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _send_one(self, msg_id: str, msg: EmailMessage):
+        for attempt in range(1, self.max_retries + 2):
+            self._set(msg_id, attempts=attempt)
+            try:
+                if self._conn is None:
+                    try:
+                        self._conn = _connect(self.settings)
+                    except Exception as e:
+                        # a rejected login (or an unreachable server, once retries run out)
+                        # pauses sending: trying again per message won't go better
+                        if not _is_transient(e) or attempt > self.max_retries:
+                            raise _ConnectFailed(f"Email error: {e}") from e
+                        raise
+                self._conn.send_message(msg)
+                self._set(msg_id, status="sent", error="")
+                return
+            except _ConnectFailed:
+                raise
+            except Exception as e:
+                if not _is_transient(e):
+                    # permanent (5xx / refused): the connection stays usable for the rest of the batch
+                    if self._conn is not None:
+                        try:
+                            self._conn.rset()
+                        except Exception:
+                            self._disconnect()
+                    self._set(msg_id, status="failed", error=f"Email error: {e}")
+                    return
+                self._disconnect()
+                if attempt > self.max_retries:
+                    self._set(msg_id, status="failed", error=f"Email error: {e}")
+                    return
+                self._set(msg_id, status="retrying", error=f"Email error: {e}")
+                time.sleep(self.retry_delay * attempt)
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                self._disconnect()  # idle: don't hold the connection open
+                continue
+            for item in batch:
+                try:
+                    if item is None:
+                        continue
+                    if time.monotonic() < self._connect_error_until:
+                        self._set(item[0], status="failed", error=self._connect_error)
+                    else:
+                        self._send_one(*item)
+                except _ConnectFailed as e:
+                    self._connect_error = str(e)
+                    self._connect_error_until = time.monotonic() + self.connect_cooldown
+                    self._set(item[0], status="failed", error=self._connect_error)
+                finally:
+                    self._queue.task_done()
+        self._disconnect()
+
+@lru_cache(maxsize=1)
+def get_mail_queue() -> MailQueue:
+    """Process-wide mail queue using the SMTP_* environment settings."""
+    return MailQueue()
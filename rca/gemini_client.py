@@ -2,6 +2,7 @@ import os, traceback
 from typing import Optional
 import streamlit as st
 import google.generativeai as genai
+from .perf import span, timed
 
 SYSTEM_PROMPT = """You are a helpful assistant that writes reading passages for primary school students.
 Write a single coherent passage that:
@@ -13,11 +14,20 @@ Write a single coherent passage that:
 Write only the passage text; no headings, no bullet points.
 """
 
+def _get_api_key() -> Optional[str]:
+    """Streamlit secrets first, then the environment (secrets may not exist when run headless)."""
+    try:
+        key = st.secrets.get("GOOGLE_API_KEY")
+    except Exception:
+        key = None
+    return key or os.environ.get("GOOGLE_API_KEY")
+
 def _length_to_bounds(length_label: str):
     if "Short" in length_label: return (120, 180)
     if "Long" in length_label:  return (260, 350)
     return (180, 260)
 
+@timed("gemini.generate_passage")
 def generate_passage(grade: str, level: str, length: str,
                      keywords: Optional[str] = "", learning_outcomes: Optional[str] = "") -> str:
     lo, hi = _length_to_bounds(length)
@@ -31,7 +41,7 @@ Tone: engaging but age-appropriate. Avoid brand names. Keep it coherent and self
 """
 
     # prefer Streamlit secrets, fall back to environment variable
-    api_key = st.secrets.get("GOOGLE_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+    api_key = _get_api_key()
 
     def _local_generator():
         """Deterministic simple local fallback passage (guarantees output)."""
@@ -67,18 +77,19 @@ Tone: engaging but age-appropriate. Avoid brand names. Keep it coherent and self
         # pick a model that supports generateContent
         chosen = None
         try:
-            for m in genai.list_models():
-                # support varied SDK shapes
-                name = getattr(m, "name", None) or getattr(m, "model", None) or str(m)
-                methods = getattr(m, "supported_generation_methods", None) or []
-                # some SDKs give strings; normalize
-                if isinstance(methods, (list, tuple)) and "generateContent" in methods:
-                    chosen = name
-                    break
-                # fallback: some metadata lists methods as strings inside a dict
-                if isinstance(methods, str) and "generateContent" in methods:
-                    chosen = name
-                    break
+            with span("gemini.list_models"):
+                for m in genai.list_models():
+                    # support varied SDK shapes
+                    name = getattr(m, "name", None) or getattr(m, "model", None) or str(m)
+                    methods = getattr(m, "supported_generation_methods", None) or []
+                    # some SDKs give strings; normalize
+                    if isinstance(methods, (list, tuple)) and "generateContent" in methods:
+                        chosen = name
+                        break
+                    # fallback: some metadata lists methods as strings inside a dict
+                    if isinstance(methods, str) and "generateContent" in methods:
+                        chosen = name
+                        break
         except Exception:
             chosen = None
 
@@ -89,8 +100,9 @@ Tone: engaging but age-appropriate. Avoid brand names. Keep it coherent and self
 
         # call chosen model
         model = genai.GenerativeModel(chosen, system_instruction=SYSTEM_PROMPT)
-        resp = model.generate_content(user_prompt.strip(),
-                                      generation_config=genai.GenerationConfig(temperature=0.7))
+        with span("gemini.generate_content"):
+            resp = model.generate_content(user_prompt.strip(),
+                                          generation_config=genai.GenerationConfig(temperature=0.7))
 
         # unwrap response safely (SDKs differ)
         text = getattr(resp, "text", None)
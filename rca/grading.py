@@ -1,23 +1,32 @@
 from typing import Dict, Any
 from rapidfuzz import fuzz
 from .nlp import get_nlp
+from .parse_store import parse
 from .constants import RAPIDFUZZ_THRESHOLD
+from .perf import span, timed
 
 def _normalize(text: str) -> str:
     return " ".join(text.lower().strip().split())
 
-def _lemma_pipe(text: str) -> str:
-    nlp = get_nlp()
-    doc = nlp(text)
+def _lemma_pipe(text: str, cached: bool = False) -> str:
+    # model answers repeat across students and come from the parse store;
+    # student answers are nearly all distinct and parsed directly
+    if cached:
+        doc = parse(text)
+    else:
+        with span("nlp.parse"):
+            doc = get_nlp()(text)
     toks = [t.lemma_.lower() for t in doc if t.is_alpha and not t.is_stop]
     return " ".join(toks)
 
+@timed("grading.grade_mcq")
 def grade_mcq(user_answer: str, correct_answer: str) -> Dict[str, Any]:
     is_correct = _normalize(user_answer) == _normalize(correct_answer)
     return {"is_correct": is_correct, "score": 1.0 if is_correct else 0.0}
 
+@timed("grading.grade_short_answer")
 def grade_short_answer(user_answer: str, correct_answer: str) -> Dict[str, Any]:
-    gold_lemmas = _lemma_pipe(correct_answer)
+    gold_lemmas = _lemma_pipe(correct_answer, cached=True)
     user_lemmas = _lemma_pipe(user_answer)
     if not user_lemmas:
         return {"is_correct": False, "score": 0.0}
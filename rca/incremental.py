@@ -0,0 +1,198 @@
+# rca/incremental.py
+"""
+Incremental question regeneration for an edited passage.
+
+The passage is cut into sentences with a cheap punctuation splitter (which
+errs on the side of not splitting: a chunk holding two sentences is still
+split by spaCy when parsed) and every sentence is keyed by a hash of its text. A SentenceStore (one per
+editing session) keeps the parsed Doc of each sentence, so after an edit
+only sentences with a new hash go through spaCy. Questions whose evidence
+sentence is still in the passage are kept as they are, teacher edits
+included, with their offsets moved to the sentence's new position; only
+the missing questions are generated, preferring changed and new sentences.
+The cost of a regeneration is therefore proportional to the size of the edit.
+With nothing to keep (the first generation, or a different passage), the
+whole passage is parsed once instead, so questions come from spaCy's
+sentences in full context, and the store is filled from that parse.
+"""
+import hashlib
+import random
+import re
+from dataclasses import replace
+from typing import Dict, List, Tuple
+
+from .dedup import NearDuplicateFilter
+from .models import Question, as_questions
+from .nlp import get_nlp
+from .perf import span, timed
+
+# candidate sentence end: ., ! or ? (plus closing quotes/brackets) followed by whitespace
+_END_RE = re.compile(r"[.!?]+[\"'”’)\]]*(?=\s)")
+_NEXT_RE = re.compile(r"\s*(\S)")
+_ABBREVIATIONS = frozenset(
+    "mr mrs ms dr prof st jr sr rev hon gen col capt lt sgt mt ft no fig vs etc approx dept est inc ltd co "
+    "jan feb mar apr jun jul aug sep sept oct nov dec".split())
+
+def _ends_sentence(text: str, m: "re.Match") -> bool:
+    nxt = _NEXT_RE.match(text, m.end())
+    if nxt and (nxt.group(1).islower() or nxt.group(1).isdigit()):
+        return False  # "p.m. on", "Jan. 5", '"Stop!" she said'
+    if text[m.start()] != ".":
+        return True
+    head = text[max(0, m.start() - 24):m.start()].rsplit(None, 1)  # abbreviations are short
+    word = head[-1].lstrip("\"'“‘([").lower() if head else ""
+    # "Dr.", initials ("J. K."), dotted abbreviations ("U.S.", "e.g.")
+    return not (word in _ABBREVIATIONS or (len(word) == 1 and word.isalpha()) or "." in word)
+
+def split_sentence_offsets(text: str) -> List[Tuple[str, int, int]]:
+    """(sentence, start, end) for every sentence of `text`, without parsing."""
+    out, start = [], 0
+    for m in _END_RE.finditer(text):
+        if _ends_sentence(text, m):
+            out.append((start, m.end()))
+            start = m.end()
+    out.append((start, len(text)))
+    sentences = []
+    for a, b in out:
+        raw = text[a:b]
+        s = raw.strip()
+        if s:
+            a += len(raw) - len(raw.lstrip())
+            sentences.append((s, a, a + len(s)))
+    return sentences
+
+def sentence_hash(sentence: str) -> str:
+    return hashlib.sha1(sentence.encode("utf-8")).hexdigest()
+
+class SentenceStore:
+    """
+    Parsed sentences by hash, pruned to the sentences of the latest passage.
+    Each entry also keeps the sentence's key-sentence score and best span,
+    so unchanged sentences cost a dict lookup on regeneration.
+    """
+
+    def __init__(self):
+        self._docs: Dict[str, tuple] = {}  # hash -> (doc, score, best span tuple or None)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._docs
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def parse(self, sentences: Dict[str, str]) -> int:
+        """
+        Makes sure every {hash: sentence} is parsed and drops sentences not in
+        the mapping. Returns how many sentences had to be parsed.
+        """
+        todo = [(s, h) for h, s in sentences.items() if h not in self._docs]
+        if todo:
+            with span("nlp.parse"):
+                docs = list(get_nlp().pipe(todo, as_tuples=True))
+            for doc, h in docs:
+                self.add(h, doc)
+        for h in [h for h in self._docs if h not in sentences]:
+            del self._docs[h]
+        return len(todo)
+
+    def add(self, key: str, doc) -> None:
+        """Stores an already parsed sentence (e.g. cut out of a whole-passage parse)."""
+        from .utils import _rank_sentence_spans, _sentence_scores
+        best = _rank_sentence_spans(doc, 1)
+        score = int(_sentence_scores(doc)[1].max()) if best else -1
+        self._docs[key] = (doc, score, best[0] if best else None)
+
+    def doc(self, key: str):
+        return self._docs[key][0]
+
+    def best(self, key: str) -> Tuple[int, tuple]:
+        """(score, (span, stripped text, start, end)) of the sentence's best span; None if it has none."""
+        _, score, best = self._docs[key]
+        return score, best
+
+def _locate(text: str, evidence: str, near: int) -> int:
+    """Position of `evidence` in text, the occurrence closest to `near` when it repeats; -1 if gone."""
+    best, pos = -1, text.find(evidence)
+    while pos >= 0:
+        if best < 0 or abs(pos - near) < abs(best - near):
+            best = pos
+        pos = text.find(evidence, pos + 1)
+    return best
+
+def _free_ids(taken, count: int) -> List[str]:
+    ids, i = [], 1
+    while len(ids) < count:
+        if f"q{i}" not in taken:
+            ids.append(f"q{i}")
+        i += 1
+    return ids
+
+@timed("qg.regenerate_questions")
+def regenerate_questions(text: str, previous, store: SentenceStore, n: int = 6,
+                         keep: bool = True) -> Tuple[List[Question], Dict[str, int]]:
+    """
+    Questions for the (edited) passage `text`, reusing `previous` questions
+    whose evidence sentence is unchanged (unless keep is False). New questions
+    never reuse an id of `previous`, so editor state keyed by id can't leak
+    into them. Returns (questions in passage order, stats) where stats counts
+    sentences, parsed sentences, kept and new questions. Offsets are relative
+    to text.strip().
+    """
+    from .qg import _fill_questions, questions_from_doc
+
+    text = text.strip()
+    previous = as_questions(previous)
+    sentences = split_sentence_offsets(text)
+    hashes = [sentence_hash(s) for s, _, _ in sentences]
+
+    # keep questions whose evidence sentence is still in the passage
+    kept, seen = [], NearDuplicateFilter()
+    for q in (previous if keep else []):
+        pos = _locate(text, q.evidence, q.sent_start) if q.evidence else -1
+        if pos >= 0 and len(kept) < n and seen.add(q):
+            kept.append(replace(q, sent_start=pos, sent_end=pos + len(q.evidence)))
+
+    if not kept:
+        # nothing to keep: parse the passage as a whole (cached by parse_store) so
+        # questions come from sentences in full context, and fill the store from it
+        from .parse_store import parse
+        doc = parse(text)
+        for (s, start, end), h in zip(sentences, hashes):
+            if h not in store:
+                sent = doc.char_span(start, end)
+                if sent is not None and sent.text == s:
+                    store.add(h, sent.as_doc())
+        store.parse(dict(zip(hashes, (s for s, _, _ in sentences))))  # prunes; parses any misaligned sentence
+        fresh = questions_from_doc(doc, n)
+        fresh = [replace(q, id=qid) for q, qid in zip(fresh, _free_ids({q.id for q in previous}, len(fresh)))]
+        return fresh, {"sentences": len(sentences), "parsed": len(sentences), "kept": 0, "new": len(fresh)}
+
+    is_new = [h not in store for h in hashes]
+    parsed = store.parse(dict(zip(hashes, (s for s, _, _ in sentences))))
+    used = {q.sent_start for q in kept}
+
+    # candidates: the best sentence of every changed / new sentence first, then unchanged unused ones
+    candidates = []
+    for (s, start, _), h, new in zip(sentences, hashes, is_new):
+        score, best = store.best(h)
+        if best is None:
+            continue
+        sent, sent_text, offset, _ = best
+        if start + offset in used:
+            continue
+        candidates.append((not new, -score, (sent, sent_text, offset, start + offset)))
+    candidates.sort(key=lambda c: c[:2])
+    need = n - len(kept)
+    key_sents = [c[2] for c in candidates[:max(need * 2, 8)]]
+    random.shuffle(key_sents)
+
+    passage_ents = [ent for h in hashes for ent in store.doc(h).ents]
+    cloze_needed = max(0, max(1, n // 2) - sum(1 for q in kept if q.qtype == "cloze"))
+    wh_needed = max(0, need - cloze_needed)
+    fresh = _fill_questions(key_sents, need, passage_ents, seen, cloze_needed, wh_needed)
+    fresh.sort(key=lambda q: q.sent_start)
+    fresh = [replace(q, id=qid) for q, qid in zip(fresh, _free_ids({q.id for q in previous}, len(fresh)))]
+
+    questions = sorted(kept + fresh, key=lambda q: q.sent_start)
+    stats = {"sentences": len(sentences), "parsed": parsed, "kept": len(kept), "new": len(fresh)}
+    return questions, stats
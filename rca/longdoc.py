@@ -0,0 +1,240 @@
+# rca/longdoc.py
+"""
+Long-document mode: question generation for chapters and whole books.
+
+The text is split at headings into sections, and long sections into windows
+of whole paragraphs (about WINDOW_WORDS words each). Only the window offsets
+are kept up front; the windows are then parsed as a stream with nlp.pipe, so
+each one is parsed exactly once and at most one pipe batch of Docs is alive
+at a time. Questions are generated per window from its Doc under a global
+quota, after which the Doc is dropped.
+
+    python -m rca.longdoc chapter.txt --out chapter_quiz.json --chapter 12
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from dataclasses import dataclass, replace
+from typing import Iterator, List, Optional, Tuple
+
+from .dedup import NearDuplicateFilter
+from .models import Question, Quiz, register_quiz
+from .perf import timed
+
+WINDOW_WORDS = 350
+PER_SECTION = 6
+MAX_QUESTIONS = 60
+PIPE_BATCH = 4
+
+_PARAGRAPH_RE = re.compile(r"(?:[^\n]*\S[^\n]*(?:\n|$))+")  # runs of non-blank lines
+_HEADING_RE = re.compile(r"^(?:#{1,6}\s+|(?:chapter|part|section|book)\b)", re.IGNORECASE)
+_SENT_END_RE = re.compile(r"(?<=[.!?])\s+")
+HEADING_MAX_WORDS = 10
+
+@dataclass(frozen=True, slots=True)
+class Section:
+    title: str
+    start: int  # character offsets into the (stripped) document
+    end: int
+
+@dataclass(frozen=True, slots=True)
+class SectionQuiz:
+    section: Section
+    quiz: Quiz
+
+# --- Splitting ---
+
+def _paragraphs(text: str) -> Iterator[Tuple[int, int]]:
+    for m in _PARAGRAPH_RE.finditer(text):
+        raw = m.group(0)
+        start = m.start() + (len(raw) - len(raw.lstrip()))
+        end = m.start() + len(raw.rstrip())
+        if end > start:
+            yield start, end
+
+def _is_heading(par: str) -> bool:
+    if "\n" in par:
+        return False
+    if _HEADING_RE.match(par):
+        return True
+    return len(par.split()) <= HEADING_MAX_WORDS and par[-1] not in ".!?:;,\"'”’)"
+
+def _split_long(text: str, start: int, end: int, max_words: int) -> Iterator[Tuple[int, int]]:
+    """Splits an oversized paragraph at sentence ends into pieces of at most ~max_words."""
+    piece_start, words, pos = start, 0, start
+    for m in _SENT_END_RE.finditer(text, start, end):
+        words += len(text[pos:m.start()].split())
+        pos = m.end()
+        if words >= max_words:
+            yield piece_start, m.start()
+            piece_start, words = pos, 0
+    if piece_start < end:
+        yield piece_start, end
+
+def split_sections(text: str, window_words: int = WINDOW_WORDS) -> List[Section]:
+    """
+    Section windows of `text` (offsets only, nothing is parsed). A new section
+    starts at every heading line; a section longer than `window_words` is cut
+    into windows of whole paragraphs, titled "<heading> (part N)".
+    """
+    max_words = 2 * window_words
+    sections: List[Section] = []
+    heading = ""
+    win_start, win_end, win_words = -1, -1, 0
+
+    def flush():
+        nonlocal win_start, win_words
+        if win_start >= 0:
+            sections.append(Section(heading, win_start, win_end))
+        win_start, win_words = -1, 0
+
+    for p_start, p_end in _paragraphs(text):
+        par = text[p_start:p_end]
+        if _is_heading(par):
+            flush()
+            heading = par.lstrip("#").strip()
+            continue
+        n_words = len(par.split())
+        pieces = _split_long(text, p_start, p_end, max_words) if n_words > max_words else [(p_start, p_end)]
+        for s, e in pieces:
+            if win_start >= 0 and win_words >= window_words:
+                flush()
+            if win_start < 0:
+                win_start = s
+            win_end = e
+            win_words += len(text[s:e].split())
+    flush()
+
+    # number the parts of sections that were split into several windows
+    counts = {}
+    for sec in sections:
+        counts[sec.title] = counts.get(sec.title, 0) + 1
+    titled, seen = [], {}
+    for i, sec in enumerate(sections, start=1):
+        title = sec.title or f"Section {i}"
+        if sec.title and counts[sec.title] > 1:
+            seen[sec.title] = seen.get(sec.title, 0) + 1
+            title = f"{sec.title} (part {seen[sec.title]})"
+        titled.append(replace(sec, title=title))
+    return titled
+
+def _allocate(n_sections: int, per_section: int, max_questions: int) -> List[int]:
+    """
+    Questions per section: the global quota (at most per_section each) cut at
+    evenly spaced points through the document, so when there are more sections
+    than questions the sections that get one are spread from start to end.
+    """
+    if n_sections == 0:
+        return []
+    quota = min(max(0, max_questions), per_section * n_sections)
+    bounds = [round(i * quota / n_sections) for i in range(n_sections + 1)]
+    return [bounds[i + 1] - bounds[i] for i in range(n_sections)]
+
+def _pick_chapter(section_quizzes: List[SectionQuiz], n: int) -> List[Question]:
+    """
+    n questions spread over the whole document: taken round-robin over the
+    sections (every section is used before any repeats, and a last partial
+    round is spread evenly), skipping near-duplicates, then put back into document order with offsets
+    shifted to the whole text.
+    """
+    # each section's queue starts at a different question, so the types stay mixed
+    queues = []
+    for i, sq in enumerate(section_quizzes):
+        qs = list(sq.quiz.questions)
+        k = i % len(qs)
+        queues.append(qs[k:] + qs[:k])
+    picked, seen = [], NearDuplicateFilter()  # a book can repeat passages across sections
+    while len(picked) < n:
+        live = [i for i, queue in enumerate(queues) if queue]
+        if not live:
+            break
+        need = n - len(picked)
+        if need < len(live):
+            live = [live[(k * len(live)) // need] for k in range(need)]
+        for i in live:
+            q, offset = queues[i].pop(0), section_quizzes[i].section.start
+            if not seen.add(q):
+                continue
+            picked.append(replace(q, sent_start=q.sent_start + offset if q.sent_start >= 0 else -1,
+                                  sent_end=q.sent_end + offset if q.sent_end >= 0 else -1))
+    picked.sort(key=lambda q: q.sent_start)
+    return [replace(q, id=f"c{i+1}") for i, q in enumerate(picked)]
+
+# --- Generation ---
+
+@timed("longdoc.generate")
+def generate_long_document_quiz(
+    text: str,
+    per_section: int = PER_SECTION,
+    max_questions: int = MAX_QUESTIONS,
+    chapter_questions: int = 0,
+    window_words: int = WINDOW_WORDS,
+    batch_size: int = PIPE_BATCH,
+) -> Tuple[List[SectionQuiz], Optional[Quiz]]:
+    """
+    Per-section quizzes for a long text, plus a whole-chapter quiz of
+    `chapter_questions` questions drawn from them (None when 0). At most
+    `max_questions` section questions are generated in total, spread evenly
+    over the document; sections left without a question are not parsed. Offsets in a section quiz are
+    relative to the section text, in the chapter quiz to the whole text.
+    """
+    from .nlp import get_nlp
+    from .qg import questions_from_doc
+
+    text = text.strip()
+    sections = split_sections(text, window_words)
+    quotas = _allocate(len(sections), per_section, max_questions)
+    todo = [(sec, n) for sec, n in zip(sections, quotas) if n > 0]
+
+    nlp = get_nlp()
+    section_quizzes: List[SectionQuiz] = []
+    # the generator hands nlp.pipe one window at a time; pipe keeps at most a batch of Docs
+    docs = nlp.pipe(((text[sec.start:sec.end], (sec, n)) for sec, n in todo),
+                    as_tuples=True, batch_size=batch_size)
+    for doc, (sec, n) in docs:
+        questions = questions_from_doc(doc, n)
+        if questions:
+            section_quizzes.append(SectionQuiz(sec, register_quiz(doc.text, questions)))
+
+    chapter = None
+    if chapter_questions > 0 and section_quizzes:
+        chapter = register_quiz(text, _pick_chapter(section_quizzes, chapter_questions))
+    return section_quizzes, chapter
+
+# --- CLI ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Question generation for chapters and books")
+    parser.add_argument("path", help="text or markdown file")
+    parser.add_argument("--out", default="-", help="JSON output file (default: stdout)")
+    parser.add_argument("--per-section", type=int, default=PER_SECTION)
+    parser.add_argument("--max-questions", type=int, default=MAX_QUESTIONS, help="quota over all sections")
+    parser.add_argument("--chapter", type=int, default=0, help="size of the whole-chapter quiz (0 = none)")
+    parser.add_argument("--window-words", type=int, default=WINDOW_WORDS)
+    args = parser.parse_args(argv)
+
+    with open(args.path, "r", encoding="utf-8") as f:
+        text = f.read()
+    started = time.perf_counter()
+    section_quizzes, chapter = generate_long_document_quiz(
+        text, per_section=args.per_section, max_questions=args.max_questions,
+        chapter_questions=args.chapter, window_words=args.window_words)
+    result = {
+        "sections": [{"title": sq.section.title, "start": sq.section.start, "end": sq.section.end,
+                      "quiz": sq.quiz.to_dict()} for sq in section_quizzes],
+        "chapter": chapter.to_dict() if chapter else None,
+    }
+    payload = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out == "-":
+        print(payload)
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(payload)
+    n_questions = sum(len(sq.quiz.questions) for sq in section_quizzes)
+    print(f"{len(section_quizzes)} sections, {n_questions} questions in {time.perf_counter() - started:.1f}s",
+          file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
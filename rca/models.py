@@ -0,0 +1,112 @@
+# rca/models.py
+"""
+Compact, immutable quiz types shared across sessions.
+
+A Question/Quiz is frozen and slotted, so one instance can be referenced by
+every session taking the same quiz: sessions keep only a quiz id and their
+own answers, and look the quiz up in the process-wide registry below.
+
+Questions carry character offsets taken from the spaCy spans: where the
+evidence sentence sits in the passage (sent_start/sent_end) and where the
+answer sits in the evidence (ans_start/ans_end); -1 means unknown (e.g.
+questions loaded from older JSON).
+"""
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+@dataclass(frozen=True, slots=True)
+class Question:
+    id: str
+    qtype: str  # "cloze" | "wh_mcq"
+    prompt: str
+    correct_answer: str
+    evidence: str
+    options: Tuple[str, ...] = ()
+    sent_start: int = -1
+    sent_end: int = -1
+    ans_start: int = -1
+    ans_end: int = -1
+
+    def answer_span(self) -> Optional[Tuple[int, int]]:
+        """(start, end) of the answer inside `evidence`, or None if unknown or stale after an edit."""
+        a, b = self.ans_start, self.ans_end
+        if 0 <= a < b <= len(self.evidence) and self.evidence[a:b] == self.correct_answer:
+            return a, b
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = asdict(self)
+        d["options"] = list(self.options)
+        return d
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Question":
+        return cls(
+            id=str(d.get("id", "")),
+            qtype=str(d.get("qtype", "")),
+            prompt=str(d.get("prompt", "")),
+            correct_answer=str(d.get("correct_answer", "")),
+            evidence=str(d.get("evidence", "")),
+            options=tuple(str(o) for o in d.get("options") or ()),
+            sent_start=int(d.get("sent_start", -1)),
+            sent_end=int(d.get("sent_end", -1)),
+            ans_start=int(d.get("ans_start", -1)),
+            ans_end=int(d.get("ans_end", -1)),
+        )
+
+def as_questions(questions: Iterable[Union[Question, Dict[str, Any]]]) -> Tuple[Question, ...]:
+    """Accepts Questions or plain dicts (e.g. from JSON) and returns a tuple of Questions."""
+    return tuple(q if isinstance(q, Question) else Question.from_dict(q) for q in questions)
+
+@dataclass(frozen=True, slots=True)
+class Quiz:
+    id: str
+    passage: str
+    questions: Tuple[Question, ...]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "passage": self.passage, "questions": [q.to_dict() for q in self.questions]}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Quiz":
+        return cls(id=d["id"], passage=d["passage"], questions=as_questions(d["questions"]))
+
+def quiz_id_for(passage: str, questions: Iterable[Question]) -> str:
+    """Content-derived id: the same passage + questions always map to the same quiz."""
+    payload = json.dumps([passage.strip(), [q.to_dict() for q in questions]], sort_keys=True)
+    return "quiz-" + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+# --- Process-wide registry ---
+
+MAX_REGISTERED_QUIZZES = 1000
+
+_lock = threading.Lock()
+_quizzes: "OrderedDict[str, Quiz]" = OrderedDict()
+
+def register_quiz(passage: str, questions: Iterable[Union[Question, Dict[str, Any]]]) -> Quiz:
+    """
+    Returns the shared Quiz for this content, creating it if needed.
+    Registering identical content twice returns the existing instance.
+    """
+    qs = as_questions(questions)
+    quiz_id = quiz_id_for(passage, qs)
+    with _lock:
+        quiz = _quizzes.get(quiz_id)
+        if quiz is None:
+            quiz = _quizzes[quiz_id] = Quiz(id=quiz_id, passage=passage.strip(), questions=qs)
+            while len(_quizzes) > MAX_REGISTERED_QUIZZES:
+                _quizzes.popitem(last=False)  # least recently used
+        else:
+            _quizzes.move_to_end(quiz_id)
+        return quiz
+
+def get_quiz(quiz_id: str) -> Optional[Quiz]:
+    with _lock:
+        quiz = _quizzes.get(quiz_id)
+        if quiz is not None:
+            _quizzes.move_to_end(quiz_id)
+        return quiz
@@ -1,6 +1,8 @@
 from functools import lru_cache
 import spacy
+from .perf import span
 
 @lru_cache(maxsize=1)
 def get_nlp():
-    return spacy.load("en_core_web_sm")
+    with span("nlp.load_model"):
+        return spacy.load("en_core_web_sm")
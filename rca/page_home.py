@@ -1,7 +1,8 @@
 import streamlit as st
 # Import the auth logic needed for the form
-# We now get USER_CREDENTIALS to look up the role after validation
-from rca.auth import check_credentials, USER_CREDENTIALS 
+# The user directory is used to look up the role after validation
+from rca.auth import check_credentials
+from rca.users import get_user
 
 def render_home_page():
     """
@@ -60,7 +61,9 @@ def render_home_page():
                     # Set session state variables using the CLEANED username
                     st.session_state.logged_in = True
                     st.session_state.username = valid_username 
-                    st.session_state.role = USER_CREDENTIALS[valid_username]["role"]
+                    user = get_user(valid_username)
+                    st.session_state.role = user["role"]
+                    st.session_state.class_name = user["class_name"]
                     st.session_state.auth_error = False
                     
                     # Trigger an immediate rerun.
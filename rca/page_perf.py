@@ -0,0 +1,37 @@
+import streamlit as st
+from rca import perf
+
+def _on_toggle():
+    perf.enable(st.session_state.perf_enabled)
+
+def render_panel():
+    """Teacher-only debug panel showing per-stage timings (spaCy, WordNet, Gemini, PDFs)."""
+
+    # The flag is process-wide: show its current state (another teacher may have
+    # flipped it) and only change it when this teacher flips the toggle.
+    st.session_state.perf_enabled = perf.is_enabled()
+    enabled = st.toggle("Record timings", key="perf_enabled", on_change=_on_toggle,
+                        help="Timings are process-wide and shared by every session on this server.")
+
+    rows = perf.snapshot()
+    if not rows:
+        st.caption("No timings recorded yet." if enabled else "Timing is off.")
+        return
+
+    st.dataframe(
+        [{k: (round(v, 1) if isinstance(v, float) else v) for k, v in r.items() if k != "buckets"} for r in rows],
+        use_container_width=True,
+        hide_index=True,
+    )
+
+    col_a, col_b, col_c = st.columns(3)
+    with col_a:
+        st.download_button("Export JSON", perf.export_json(), file_name="rca_timings.json",
+                           mime="application/json", use_container_width=True)
+    with col_b:
+        st.download_button("Export Prometheus", perf.export_prometheus(), file_name="rca_timings.prom",
+                           mime="text/plain", use_container_width=True)
+    with col_c:
+        if st.button("Reset", key="perf_reset", use_container_width=True):
+            perf.reset()
+            st.rerun()
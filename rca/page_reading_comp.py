@@ -1,8 +1,15 @@
 import json
 import io
+from dataclasses import replace
+from html import escape
 import streamlit as st
 
-from rca.qg import generate_questions
+from rca.incremental import SentenceStore, regenerate_questions
+from rca.perf import timed
+from rca.models import Question, as_questions, register_quiz
+from rca.assignments import publish_quiz
+from rca.dedup import find_similar
+from rca.utils import highlight_evidence
 
 # PDF generation imports
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
@@ -10,6 +17,7 @@ from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import inch
 
+@timed("pdf.build_quiz_pdf")
 def build_quiz_pdf(passage: str, questions: list) -> io.BytesIO:
     """
     Build a student-facing PDF:
@@ -18,6 +26,7 @@ def build_quiz_pdf(passage: str, questions: list) -> io.BytesIO:
     - NO answers
     - Shows lines/space for students to write
     """
+    questions = as_questions(questions)
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4)
     styles = getSampleStyleSheet()
@@ -35,7 +44,7 @@ def build_quiz_pdf(passage: str, questions: list) -> io.BytesIO:
     # Passage
     story.append(Paragraph("<b>Passage</b>", styles["Heading2"]))
     story.append(Spacer(1, 0.1 * inch))
-    story.append(Paragraph(passage.replace("\n", "<br/>"), styles["Normal"]))
+    story.append(Paragraph(escape(passage, quote=False).replace("\n", "<br/>"), styles["Normal"]))
     story.append(Spacer(1, 0.4 * inch))
 
     # Questions
@@ -55,15 +64,15 @@ def build_quiz_pdf(passage: str, questions: list) -> io.BytesIO:
             canvas._curr_y = y - 12
             
     for i, q in enumerate(questions):
-        prompt = q.get("prompt", "").strip()
+        prompt = escape(q.prompt.strip(), quote=False)  # plain text, not Paragraph markup
 
         story.append(Paragraph(f"{i + 1}. {prompt}", styles["Normal"]))
         story.append(Spacer(1, 0.1 * inch))
 
         # MCQ options (no answers revealed)
-        if q.get("qtype") == "wh_mcq" and q.get("options"):
-            for j, opt in enumerate(q["options"]):
-                story.append(Paragraph(f"{chr(65 + j)}. {opt}", styles["Normal"]))
+        if q.qtype == "wh_mcq" and q.options:
+            for j, opt in enumerate(q.options):
+                story.append(Paragraph(f"{chr(65 + j)}. {escape(opt, quote=False)}", styles["Normal"]))
             story.append(Spacer(1, 0.15 * inch))
 
         # "Lines" for students to write on (3 fake lines)
@@ -78,11 +87,13 @@ def build_quiz_pdf(passage: str, questions: list) -> io.BytesIO:
     return buffer
 
 
+@timed("pdf.build_answer_key_pdf")
 def build_answer_key_pdf(passage: str, questions: list) -> io.BytesIO:
     """
     Build a teacher-facing Answer Key PDF:
     - Lists questions and correct answers
     """
+    questions = as_questions(questions)
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4)
     styles = getSampleStyleSheet()
@@ -96,16 +107,16 @@ def build_answer_key_pdf(passage: str, questions: list) -> io.BytesIO:
     story.append(Spacer(1, 0.2 * inch))
 
     for i, q in enumerate(questions):
-        prompt = q.get("prompt", "").strip()
-        correct_answer = q.get("correct_answer", "").strip()
+        prompt = escape(q.prompt.strip(), quote=False)  # plain text, not Paragraph markup
+        correct_answer = escape(q.correct_answer.strip(), quote=False)
 
         story.append(Paragraph(f"{i + 1}. {prompt}", styles["Normal"]))
         story.append(Spacer(1, 0.05 * inch))
 
         # Show options for MCQ
-        if q.get("qtype") == "wh_mcq" and q.get("options"):
-            for j, opt in enumerate(q["options"]):
-                story.append(Paragraph(f"{chr(65 + j)}. {opt}", styles["Normal"]))
+        if q.qtype == "wh_mcq" and q.options:
+            for j, opt in enumerate(q.options):
+                story.append(Paragraph(f"{chr(65 + j)}. {escape(opt, quote=False)}", styles["Normal"]))
             story.append(Spacer(1, 0.05 * inch))
 
         # Show correct answer
@@ -115,12 +126,186 @@ def build_answer_key_pdf(passage: str, questions: list) -> io.BytesIO:
                 styles["Normal"],
             )
         )
+
+        # Evidence with the answer in bold (sliced at the stored offsets)
+        if q.answer_span():
+            story.append(Paragraph(f"<i>Evidence:</i> {highlight_evidence(q, '<b>', '</b>', search=False)}",
+                                   styles["Normal"]))
         story.append(Spacer(1, 0.2 * inch))
 
     doc.build(story)
     buffer.seek(0)
     return buffer
 
+@st.cache_data(show_spinner=False)
+def _load_samples() -> list:
+    """Reads the bundled sample passages once per process instead of on every rerun."""
+    try:
+        with open("data/sample_passages.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return []
+
+
+def _bank_match(q: Question):
+    """Closest question in another teacher's published quiz, or None."""
+    matches = find_similar(q, limit=1, exclude_published_by=st.session_state.get("username") or None)
+    return matches[0] if matches else None
+
+def _refresh_bank_matches():
+    """Looks every question up in the question bank once (after generating or publishing), keyed by id."""
+    st.session_state.bank_matches = {q.id: _bank_match(q) for q in st.session_state.questions}
+
+@st.fragment
+def _render_question_editor(i: int):
+    """
+    Renders the editor for a single question.
+    Runs as a fragment, so a keystroke here only reruns this question's
+    widgets instead of the whole page (sample load, other editors, PDFs).
+    Questions are immutable: edits store a replaced copy in the draft list.
+    """
+    q: Question = st.session_state.questions[i]
+    st.markdown(f"### Q{i+1} — {q.qtype.upper()}")
+
+    # Editable prompt
+    prompt_key = f"prompt_{q.id}"
+    new_prompt = st.text_area(
+        "Question text",
+        value=q.prompt,
+        key=prompt_key,
+    )
+    updates = {"prompt": new_prompt}
+
+    # MCQ options (if applicable)
+    if q.qtype == "wh_mcq" and q.options:
+        st.markdown("**Options**")
+        new_options = []
+        for j, opt in enumerate(q.options):
+            opt_key = f"opt_{q.id}_{j}"
+            new_opt = st.text_input(
+                f"Option {j+1}",
+                value=opt,
+                key=opt_key,
+            )
+            new_options.append(new_opt)
+
+        # Update options
+        updates["options"] = tuple(new_options)
+
+        # Choose correct answer from options
+        st.markdown("**Correct option**")
+        try:
+            current_idx = new_options.index(q.correct_answer)
+        except ValueError:
+            current_idx = 0 if new_options else 0
+
+        if new_options:
+            correct_opt = st.selectbox(
+                "Select correct option",
+                new_options,
+                index=current_idx,
+                key=f"correct_{q.id}",
+            )
+            updates["correct_answer"] = correct_opt
+
+    else:
+        # Short-answer / open-ended: editable correct answer text
+        correct_key = f"correct_{q.id}"
+        new_correct = st.text_input(
+            "Correct answer (for teacher reference)",
+            value=q.correct_answer,
+            key=correct_key,
+        )
+        updates["correct_answer"] = new_correct
+
+    if any(getattr(q, k) != v for k, v in updates.items()):
+        st.session_state.questions[i] = replace(q, **updates)
+        if updates.get("correct_answer", q.correct_answer) != q.correct_answer:
+            # the bank compares answers, so only an answer edit can change this question's flag
+            st.session_state.setdefault("bank_matches", {})[q.id] = _bank_match(st.session_state.questions[i])
+        # PDFs built before this edit are stale; the export fragment doesn't rerun
+        # with this one, so rerun the page to take its download buttons away
+        if st.session_state.pop("export_pdfs", None) is not None:
+            st.rerun()
+
+    # Flag questions that already exist in another teacher's published quiz
+    m = st.session_state.get("bank_matches", {}).get(q.id)
+    if m:
+        st.warning(f"Similar to a question in an already published quiz ({m['similarity']:.0%} match): {m['prompt']}")
+
+    # Optional: show evidence as read-only
+    evidence = q.evidence
+    if evidence:
+        with st.expander("Show evidence (from passage)"):
+            st.write(evidence)
+
+    st.markdown("---")
+
+
+@st.fragment
+def _render_export(text: str):
+    """
+    Renders the PDF export section.
+    PDFs are built on demand from the current (edited) questions rather than
+    on every rerun. A question editor drops the build (and reruns the page)
+    when it changes a question, and the signature check below catches any
+    other change, so the download buttons always serve the current quiz.
+    """
+    st.subheader("⬇️ Export Quiz")
+
+    signature = json.dumps([text, [q.to_dict() for q in st.session_state.questions]], sort_keys=True)
+    built = st.session_state.get("export_pdfs")
+    if built and built["signature"] != signature:
+        built = None
+
+    if built is None:
+        if st.button("Prepare PDFs", key="prepare_pdfs", use_container_width=True):
+            built = {
+                "signature": signature,
+                "quiz": build_quiz_pdf(text, st.session_state.questions).getvalue(),
+                "answer_key": build_answer_key_pdf(text, st.session_state.questions).getvalue(),
+            }
+            st.session_state.export_pdfs = built
+        else:
+            st.caption("Finish editing, then prepare the PDFs for download.")
+            return
+
+    col_a, col_b = st.columns(2)
+    with col_a:
+        st.download_button(
+            label="Download Quiz (PDF)",
+            data=built["quiz"],
+            file_name="reading_quiz.pdf",
+            mime="application/pdf",
+            use_container_width=True,
+        )
+
+    with col_b:
+        st.download_button(
+            label="Download Answer Key (PDF)",
+            data=built["answer_key"],
+            file_name="reading_quiz_answer_key.pdf",
+            mime="application/pdf",
+            use_container_width=True,
+        )
+
+@st.fragment
+def _render_publish(text: str):
+    """Publishes the current (edited) quiz to a class; students see it on their next load."""
+    st.subheader("📣 Publish to Class")
+    col_a, col_b = st.columns([2, 1])
+    with col_a:
+        class_name = st.text_input("Class", value="Class 1", key="publish_class")
+    with col_b:
+        st.write("")
+        publish = st.button("Publish Quiz", key="publish_quiz", use_container_width=True,
+                            disabled=not class_name.strip())
+    if publish:
+        quiz = publish_quiz(class_name, text, st.session_state.questions,
+                            published_by=st.session_state.get("username") or "")
+        _refresh_bank_matches()
+        st.success(f"Published to {class_name.strip()} ({len(quiz.questions)} questions).")
+
 def render_page():
     """Renders the Reading Comprehension Quiz Editor (teacher view)."""
 
@@ -132,11 +317,7 @@ def render_page():
     # --- Sample Passage Loader (right) ---
     with col_right:
         st.subheader("📚 Samples")
-        try:
-            with open("data/sample_passages.json", "r", encoding="utf-8") as f:
-                samples = json.load(f)
-        except Exception:
-            samples = []
+        samples = _load_samples()
 
         sample_titles = ["(none)"] + [s["title"] for s in samples]
         pick = st.selectbox("Load a sample passage:", sample_titles, index=0)
@@ -168,10 +349,32 @@ def render_page():
     if "questions" not in st.session_state:
         st.session_state.questions = []
 
+    # Parsed sentences of this session's passage, so regenerating after an edit
+    # only parses the sentences that changed
+    if "sentence_store" not in st.session_state:
+        st.session_state.sentence_store = SentenceStore()
+
+    keep_unchanged = st.checkbox(
+        "Keep questions on unchanged sentences",
+        value=True,
+        help="Regenerate only the questions whose sentence was edited; your edits to the others are kept.",
+    )
+
     # --- Question Generation Button ---
     if st.button("Generate Questions", type="primary", disabled=not text.strip()):
         with st.spinner("Generating questions..."):
-            st.session_state.questions = generate_questions(text, n=n_questions)
+            questions, stats = regenerate_questions(text, st.session_state.questions, st.session_state.sentence_store,
+                                                    n=n_questions, keep=keep_unchanged)
+            quiz = register_quiz(text, questions)
+
+        # The session keeps the shared quiz's id plus its own editable draft;
+        # unedited draft questions are the registry's instances, not copies.
+        st.session_state.quiz_id = quiz.id
+        st.session_state.questions = list(quiz.questions)
+        _refresh_bank_matches()
+        if stats["kept"]:
+            st.caption(f"Kept {stats['kept']} questions, added {stats['new']} "
+                       f"(parsed {stats['parsed']} of {stats['sentences']} sentences).")
 
         # keep the latest passage in session_state so it's exported correctly
         st.session_state.current_passage = text
@@ -187,90 +390,11 @@ def render_page():
         if not is_teacher:
             st.info("This page is currently in teacher-only mode. Editing is disabled.")
         else:
-            for i, q in enumerate(st.session_state.questions):
-                st.markdown(f"### Q{i+1} — {q.get('qtype', '').upper()}")
-
-                # Editable prompt
-                prompt_key = f"prompt_{q['id']}"
-                new_prompt = st.text_area(
-                    "Question text",
-                    value=q["prompt"],
-                    key=prompt_key,
-                )
-                q["prompt"] = new_prompt
-
-                # MCQ options (if applicable)
-                if q.get("qtype") == "wh_mcq" and q.get("options"):
-                    st.markdown("**Options**")
-                    new_options = []
-                    for j, opt in enumerate(q["options"]):
-                        opt_key = f"opt_{q['id']}_{j}"
-                        new_opt = st.text_input(
-                            f"Option {j+1}",
-                            value=opt,
-                            key=opt_key,
-                        )
-                        new_options.append(new_opt)
-
-                    # Update options
-                    q["options"] = new_options
-
-                    # Choose correct answer from options
-                    st.markdown("**Correct option**")
-                    try:
-                        current_idx = new_options.index(q.get("correct_answer", ""))
-                    except ValueError:
-                        current_idx = 0 if new_options else 0
-
-                    if new_options:
-                        correct_opt = st.selectbox(
-                            "Select correct option",
-                            new_options,
-                            index=current_idx,
-                            key=f"correct_{q['id']}",
-                        )
-                        q["correct_answer"] = correct_opt
-
-                else:
-                    # Short-answer / open-ended: editable correct answer text
-                    correct_key = f"correct_{q['id']}"
-                    new_correct = st.text_input(
-                        "Correct answer (for teacher reference)",
-                        value=q.get("correct_answer", ""),
-                        key=correct_key,
-                    )
-                    q["correct_answer"] = new_correct
-
-                # Optional: show evidence as read-only
-                evidence = q.get("evidence")
-                if evidence:
-                    with st.expander("Show evidence (from passage)"):
-                        st.write(evidence)
-
-                st.markdown("---")
+            # Each question is its own fragment: editing one doesn't rerun the others
+            for i in range(len(st.session_state.questions)):
+                _render_question_editor(i)
 
         # --- Export / Download section ---
         if is_teacher:
-            st.subheader("⬇️ Export Quiz")
-
-            quiz_pdf = build_quiz_pdf(text, st.session_state.questions)
-            answer_key_pdf = build_answer_key_pdf(text, st.session_state.questions)
-
-            col_a, col_b = st.columns(2)
-            with col_a:
-                st.download_button(
-                    label="Download Quiz (PDF)",
-                    data=quiz_pdf,
-                    file_name="reading_quiz.pdf",
-                    mime="application/pdf",
-                    use_container_width=True,
-                )
-
-            with col_b:
-                st.download_button(
-                    label="Download Answer Key (PDF)",
-                    data=answer_key_pdf,
-                    file_name="reading_quiz_answer_key.pdf",
-                    mime="application/pdf",
-                    use_container_width=True,
-                )
+            _render_export(text)
+            _render_publish(text)
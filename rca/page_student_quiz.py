@@ -0,0 +1,75 @@
+import streamlit as st
+from html import escape
+
+from rca.assignments import get_assigned_quiz
+from rca.grading import grade_mcq, grade_short_answer
+from rca.utils import highlight_evidence
+
+def _load_css():
+    try:
+        with open("assets/styles.css", "r", encoding="utf-8") as f:
+            st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+    except Exception:
+        pass
+
+def render_page():
+    """Renders the student's assigned quiz (read from the shared assignment cache) and feedback."""
+
+    class_name = st.session_state.get("class_name")
+    quiz = get_assigned_quiz(class_name) if class_name else None
+    if quiz is None:
+        st.info("No quiz has been assigned to your class yet. Check back later!")
+        return
+
+    # The session holds only the quiz id and this student's answers;
+    # the quiz itself is shared by every student in the class.
+    if st.session_state.get("quiz_id") != quiz.id:
+        st.session_state.quiz_id = quiz.id
+        st.session_state.answers = {}
+        st.session_state.submitted_quiz_id = None
+
+    _load_css()
+    st.subheader("Assigned Quiz")
+    st.markdown("#### Passage")
+    st.write(quiz.passage)
+    st.markdown("---")
+
+    with st.form(f"quiz_form_{quiz.id}"):
+        answers = {}
+        for i, q in enumerate(quiz.questions):
+            label = f"**Q{i+1}.** {q.prompt}"
+            if q.qtype == "wh_mcq" and q.options:
+                choice = st.radio(label, list(q.options), index=None, key=f"ans_{quiz.id}_{q.id}")
+                answers[q.id] = choice or ""
+            else:
+                answers[q.id] = st.text_input(label, key=f"ans_{quiz.id}_{q.id}")
+        submitted = st.form_submit_button("Submit Quiz and Get Instant Feedback", type="primary")
+
+    if submitted:
+        st.session_state.answers = answers
+        st.session_state.submitted_quiz_id = quiz.id
+
+    if st.session_state.get("submitted_quiz_id") != quiz.id:
+        return
+
+    # --- Feedback ---
+    st.markdown("---")
+    st.subheader("Feedback")
+    answers = st.session_state.answers
+    total = 0.0
+    for i, q in enumerate(quiz.questions):
+        user = answers.get(q.id, "")
+        if q.qtype == "wh_mcq":
+            result = grade_mcq(user, q.correct_answer)
+        else:
+            result = grade_short_answer(user, q.correct_answer)
+        total += result["score"]
+
+        css = "feedback-correct" if result["is_correct"] else "feedback-wrong"
+        verdict = "Correct!" if result["is_correct"] else f"Answer: {escape(q.correct_answer)}"
+        st.markdown(f"**Q{i+1}.** {escape(q.prompt)}")
+        st.markdown(f"<div class='{css}'>{verdict}</div>", unsafe_allow_html=True)
+        evidence = highlight_evidence(q)
+        st.markdown(f"<div class='evidence'>{evidence}</div>", unsafe_allow_html=True)
+
+    st.success(f"Score: {total:g} / {len(quiz.questions)}")
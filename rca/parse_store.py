@@ -0,0 +1,185 @@
+# rca/parse_store.py
+"""
+Persistent store of spaCy parses.
+
+A parsed passage is saved as a DocBin file keyed on a hash of its exact
+text and on the model (name, version, spaCy version and pipeline), so a
+passage parsed once is loaded back on later runs instead of going through
+the pipeline again:
+
+    data/parses/<model key>/<hash[:2]>/<hash>.spacy   (RCA_PARSE_DIR)
+
+Changing the model changes the key, so old parses are never used; the
+first lookup in a process deletes the directories of other models. The
+store is kept under RCA_PARSE_MAX_MB (0 turns it off) by deleting the least
+recently used files. Recent Docs are also kept in memory. Short texts
+(under MIN_PERSIST_CHARS) parse faster than a file read and are only kept
+in memory. One-off texts (batch runs, API calls) should pass cached=False
+so they don't fill either store.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import spacy
+from spacy.tokens import DocBin
+
+from .nlp import get_nlp
+from .perf import span
+
+PARSE_DIR = os.getenv("RCA_PARSE_DIR", os.path.join("data", "parses"))
+MAX_DISK_MB = float(os.getenv("RCA_PARSE_MAX_MB", "256"))
+MEMORY_ITEMS = 128
+MIN_PERSIST_CHARS = 200
+
+@lru_cache(maxsize=1)
+def model_key() -> str:
+    """Identifies the loaded pipeline; any change to the model gives a new key."""
+    nlp = get_nlp()
+    meta = nlp.meta
+    raw = json.dumps([meta.get("lang"), meta.get("name"), meta.get("version"), spacy.__version__, nlp.pipe_names])
+    return "{}_{}-{}-{}".format(meta.get("lang"), meta.get("name"), meta.get("version"),
+                                hashlib.sha1(raw.encode("utf-8")).hexdigest()[:10])
+
+def _text_key(text: str) -> str:
+    # exact text, not stripped: Doc offsets must match what the caller passed
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+# --- Memory ---
+
+_lock = threading.Lock()
+_memory: "OrderedDict[str, object]" = OrderedDict()
+
+def _remember(key: str, doc):
+    with _lock:
+        _memory[key] = doc
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_ITEMS:
+            _memory.popitem(last=False)
+
+def clear_memory():
+    with _lock:
+        _memory.clear()
+
+# --- Disk ---
+
+_pruned = set()
+
+def _model_dir() -> str:
+    mk = model_key()
+    path = os.path.join(PARSE_DIR, mk)
+    if PARSE_DIR not in _pruned:
+        with _lock:
+            if os.path.isdir(PARSE_DIR):
+                for name in os.listdir(PARSE_DIR):
+                    if name != mk:
+                        shutil.rmtree(os.path.join(PARSE_DIR, name), ignore_errors=True)
+            _pruned.add(PARSE_DIR)
+    return path
+
+def _path(key: str) -> str:
+    return os.path.join(_model_dir(), key[:2], key + ".spacy")
+
+_disk_bytes = None  # running estimate of the store's size, set by the first prune
+_prune_lock = threading.Lock()
+
+def _prune(root: str):
+    """Deletes the least recently used parses until the store is under 90% of MAX_DISK_MB."""
+    global _disk_bytes
+    with _prune_lock:
+        files = []
+        for dirpath, _, names in os.walk(root):
+            for name in names:
+                if name.endswith(".spacy"):
+                    try:
+                        st = os.stat(os.path.join(dirpath, name))
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, os.path.join(dirpath, name)))
+        total = sum(size for _, size, _ in files)
+        budget = MAX_DISK_MB * 1024 * 1024
+        if total > budget:
+            files.sort()  # oldest first (loads bump the mtime)
+            for _, size, p in files:
+                if total <= 0.9 * budget:
+                    break
+                try:
+                    os.remove(p)
+                    total -= size
+                except OSError:
+                    pass
+        _disk_bytes = total
+
+def _load(path: str):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    try:
+        doc = next(iter(DocBin().from_bytes(data).get_docs(get_nlp().vocab)))
+    except Exception:
+        return None  # unreadable file: parse again and overwrite it
+    try:
+        os.utime(path)  # mark as recently used for pruning
+    except OSError:
+        pass
+    return doc
+
+def _save(path: str, doc):
+    """Best effort: a read-only or full disk only costs a re-parse next time."""
+    global _disk_bytes
+    tmp = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write-then-rename, so a concurrent reader never sees a partial file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        data = DocBin(docs=[doc]).to_bytes()
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        if tmp and os.path.exists(tmp):
+            os.remove(tmp)
+        return
+    with _lock:
+        if _disk_bytes is not None:
+            _disk_bytes += len(data)
+    if _disk_bytes is None or _disk_bytes > MAX_DISK_MB * 1024 * 1024:
+        _prune(os.path.dirname(os.path.dirname(path)))
+
+# --- Lookup ---
+
+def parse(text: str, cached: bool = True):
+    """
+    The parsed Doc for `text`: from memory, else from the store, else from
+    the pipeline (and then stored). Returned Docs are shared; treat them as
+    read-only. With cached=False the text is parsed directly and neither
+    store is read or written.
+    """
+    if not cached:
+        with span("nlp.parse"):
+            return get_nlp()(text)
+    key = _text_key(text)
+    with _lock:
+        doc = _memory.get(key)
+        if doc is not None:
+            _memory.move_to_end(key)
+            return doc
+    path = _path(key) if len(text) >= MIN_PERSIST_CHARS and MAX_DISK_MB > 0 else None
+    doc = None
+    if path:
+        with span("nlp.load_parse"):
+            doc = _load(path)
+    if doc is None:
+        with span("nlp.parse"):
+            doc = get_nlp()(text)
+        if path:
+            _save(path, doc)
+    _remember(key, doc)
+    return doc
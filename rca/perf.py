@@ -0,0 +1,164 @@
+# rca/perf.py
+"""
+Lightweight per-stage timing.
+
+    from .perf import span, timed
+
+    with span("nlp.parse"):
+        doc = nlp(text)
+
+    @timed("qg.generate_questions")
+    def generate_questions(...): ...
+
+Durations are aggregated per span name into fixed-bucket histograms
+(process-wide, shared by all Streamlit sessions). Timing is off unless
+RCA_PERF=1 is set or enable() is called; when off, span() hands back a
+shared no-op object and timed() adds a single flag check per call.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from typing import Dict, List
+
+# Upper bounds in seconds; the last bucket is +Inf
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = os.getenv("RCA_PERF", "").strip().lower() in ("1", "true", "yes", "on")
+_lock = threading.Lock()
+_histograms: Dict[str, "Histogram"] = {}
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile, capped at the observed max."""
+        if not self.count:
+            return 0.0
+        target, seen = q * self.count, 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+def enable(on: bool = True):
+    global _enabled
+    _enabled = on
+
+def is_enabled() -> bool:
+    return _enabled
+
+def record(name: str, seconds: float):
+    with _lock:
+        h = _histograms.get(name)
+        if h is None:
+            h = _histograms[name] = Histogram()
+        h.observe(seconds)
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _NoopSpan()
+
+def span(name: str):
+    """Context manager timing the enclosed block under `name`."""
+    return _Span(name) if _enabled else _NOOP
+
+def timed(name: str):
+    """Decorator timing every call of the wrapped function under `name`."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return deco
+
+# --- Export ---
+
+def snapshot() -> List[Dict]:
+    """One summary row per span, slowest total first."""
+    with _lock:
+        items = [(name, h.count, h.total, h.min, h.max, h.quantile(0.5), h.quantile(0.95), list(h.counts))
+                 for name, h in _histograms.items()]
+    rows = []
+    for name, count, total, lo, hi, p50, p95, counts in items:
+        rows.append({
+            "span": name,
+            "count": count,
+            "total_ms": total * 1000,
+            "mean_ms": total / count * 1000 if count else 0.0,
+            "min_ms": lo * 1000 if count else 0.0,
+            "max_ms": hi * 1000,
+            "p50_ms": p50 * 1000,
+            "p95_ms": p95 * 1000,
+            "buckets": counts,
+        })
+    rows.sort(key=lambda r: r["total_ms"], reverse=True)
+    return rows
+
+def export_json() -> str:
+    return json.dumps({"bucket_upper_bounds_s": list(BUCKETS) + ["+Inf"], "spans": snapshot()}, indent=2)
+
+def export_prometheus() -> str:
+    """Prometheus text exposition format (cumulative `le` buckets, seconds)."""
+    metric = "rca_span_duration_seconds"
+    lines = [f"# HELP {metric} Time spent in instrumented RCA stages.", f"# TYPE {metric} histogram"]
+    for row in sorted(snapshot(), key=lambda r: r["span"]):
+        label = row["span"].replace("\\", "\\\\").replace('"', '\\"')
+        cumulative = 0
+        for i, c in enumerate(row["buckets"]):
+            cumulative += c
+            le = f"{BUCKETS[i]:g}" if i < len(BUCKETS) else "+Inf"
+            lines.append(f'{metric}_bucket{{span="{label}",le="{le}"}} {cumulative}')
+        lines.append(f'{metric}_sum{{span="{label}"}} {row["total_ms"] / 1000:.6f}')
+        lines.append(f'{metric}_count{{span="{label}"}} {row["count"]}')
+    return "\n".join(lines) + "\n"
@@ -1,9 +1,14 @@
 import random
-from typing import Dict, List, Any
+from dataclasses import replace
+from typing import Dict, List, Optional
 from nltk.corpus import wordnet as wn
-from .nlp import get_nlp
+from .parse_store import parse
 from .constants import WH_TAGS, SUPPORTED_ENTS, CLOZE_POS, CLOZE_BLACKLIST
+from .perf import timed
+from .models import Question
+from .dedup import NearDuplicateFilter
 
+@timed("qg.wordnet_lookup")
 def _synonym_distractors(word: str, pos_hint: str, limit: int = 6) -> List[str]:
     pos_map = {"NOUN": wn.NOUN, "VERB": wn.VERB, "ADJ": wn.ADJ, "ADV": wn.ADV}
     wn_pos = pos_map.get(pos_hint, None)
@@ -16,75 +21,129 @@ def _synonym_distractors(word: str, pos_hint: str, limit: int = 6) -> List[str]:
                     cands.add(txt)
     return list(cands)[:limit]
 
-def _entity_distractors(doc, target_ent, limit=6):
-    cands = {ent.text for ent in doc.ents if ent.label_ == target_ent.label_ and ent.text != target_ent.text}
+def _entity_distractors(ents, target_ent, limit=6):
+    cands = {ent.text for ent in ents if ent.label_ == target_ent.label_ and ent.text != target_ent.text}
     return list(cands)[:limit]
 
-def make_cloze_from_sentence(sent_text: str) -> Dict[str, Any]:
-    nlp = get_nlp()
-    sent_doc = nlp(sent_text)
-    candidates = [t for t in sent_doc if t.pos_ in CLOZE_POS and t.lemma_.lower() not in CLOZE_BLACKLIST and t.is_alpha]
+def _blank(sent_text: str, start: int, end: int) -> str:
+    """Blanks exactly the chosen span (not just the first textual match)."""
+    return sent_text[:start] + "____" + sent_text[end:]
+
+def _cloze_from_span(sent, sent_text: str, offset: int, sent_start: int = -1, avoid=()) -> Optional[Question]:
+    """
+    Cloze question from a parsed sentence span; `offset` is where sent_text
+    starts in sent.doc.text. Answers in `avoid` (lower-cased) are not picked.
+    """
+    candidates = [t for t in sent if t.pos_ in CLOZE_POS and t.lemma_.lower() not in CLOZE_BLACKLIST and t.is_alpha
+                  and t.text.lower() not in avoid]
     if not candidates:
-        return {}
+        return None
     token = random.choice(candidates)
     answer = token.text
-    prompt = sent_text.replace(token.text, "____", 1)
-    return {
-        "qtype": "cloze",
-        "prompt": f"Fill in the blank: {prompt}",
-        "options": [],
-        "correct_answer": answer,
-        "evidence": sent_text
-    }
+    ans_start = token.idx - offset
+    ans_end = ans_start + len(token.text)
+    prompt = _blank(sent_text, ans_start, ans_end)
+    return Question(
+        id="",
+        qtype="cloze",
+        prompt=f"Fill in the blank: {prompt}",
+        correct_answer=answer,
+        evidence=sent_text,
+        sent_start=sent_start,
+        sent_end=sent_start + len(sent_text) if sent_start >= 0 else -1,
+        ans_start=ans_start,
+        ans_end=ans_end,
+    )
 
-def make_wh_from_sentence(sent_text: str, passage_text: str) -> Dict[str, Any]:
-    nlp = get_nlp()
-    doc = nlp(passage_text)
-    sent_doc = nlp(sent_text)
-    ents = [ent for ent in sent_doc.ents if ent.label_ in SUPPORTED_ENTS]
+def _wh_from_span(sent, sent_text: str, offset: int, passage_ents, sent_start: int = -1,
+                  avoid=()) -> Optional[Question]:
+    """Who/when/where question from a parsed sentence span; distractors come from `passage_ents`."""
+    ents = [ent for ent in sent.ents if ent.label_ in SUPPORTED_ENTS and ent.text.lower() not in avoid]
     if not ents:
-        return {}
+        return None
     ent = random.choice(ents)
     wh = WH_TAGS[ent.label_]
-    question = sent_text.replace(ent.text, "____", 1)
-    dists = _entity_distractors(doc, ent, limit=6)
+    ans_start = ent.start_char - offset
+    ans_end = ent.end_char - offset
+    question = _blank(sent_text, ans_start, ans_end)
+    dists = _entity_distractors(passage_ents, ent, limit=6)
     if len(dists) < 3:
         fillers = ["N/A", "Unknown", "Not stated"]
         dists.extend([f for f in fillers if f.lower() != ent.text.lower()])
     options = [ent.text] + dists[:3]
     random.shuffle(options)
-    return {
-        "qtype": "wh_mcq",
-        "prompt": f"{wh} is missing in the sentence: {question}",
-        "options": options,
-        "correct_answer": ent.text,
-        "evidence": sent_text
-    }
+    return Question(
+        id="",
+        qtype="wh_mcq",
+        prompt=f"{wh} is missing in the sentence: {question}",
+        correct_answer=ent.text,
+        evidence=sent_text,
+        options=tuple(options),
+        sent_start=sent_start,
+        sent_end=sent_start + len(sent_text) if sent_start >= 0 else -1,
+        ans_start=ans_start,
+        ans_end=ans_end,
+    )
 
-def generate_questions(passage_text: str, n: int = 6) -> List[Dict[str, Any]]:
-    from .utils import pick_key_sentences
-    key_sents = pick_key_sentences(passage_text, k=max(n*2, 8))
-    random.shuffle(key_sents)
+def make_cloze_from_sentence(sent_text: str, sent_start: int = -1) -> Optional[Question]:
+    sent_doc = parse(sent_text)
+    return _cloze_from_span(sent_doc[:], sent_text, 0, sent_start)
+
+def make_wh_from_sentence(sent_text: str, passage_text: str, sent_start: int = -1) -> Optional[Question]:
+    doc = parse(passage_text)
+    sent_doc = parse(sent_text)
+    return _wh_from_span(sent_doc[:], sent_text, 0, doc.ents, sent_start)
+
+def _fill_questions(key_sents, n: int, passage_ents, seen: NearDuplicateFilter,
+                    cloze_needed: int, wh_needed: int) -> List[Question]:
+    """
+    Up to n questions (ids left empty) from key sentences given as
+    (span, stripped text, text offset in the span's doc, offset in the passage):
+    cloze / wh in the requested mix first, then whatever the sentences allow.
+    """
     questions = []
-    cloze_needed = max(1, n // 2)
-    wh_needed = n - cloze_needed
-    for s in key_sents:
+    if n <= 0:
+        return questions
+    asked: Dict[str, set] = {}  # sentence -> lower-cased answers already asked about it
+    for sent, s, offset, sent_start in key_sents:
         if cloze_needed > 0:
-            q = make_cloze_from_sentence(s)
-            if q:
+            q = _cloze_from_span(sent, s, offset, sent_start)
+            if q and seen.add(q):
                 questions.append(q); cloze_needed -= 1
+                asked.setdefault(s, set()).add(q.correct_answer.lower())
                 if len(questions) >= n: break
                 continue
         if wh_needed > 0:
-            q = make_wh_from_sentence(s, passage_text)
-            if q:
+            q = _wh_from_span(sent, s, offset, passage_ents, sent_start)
+            if q and seen.add(q):
                 questions.append(q); wh_needed -= 1
+                asked.setdefault(s, set()).add(q.correct_answer.lower())
                 if len(questions) >= n: break
                 continue
-    for s in key_sents:
+    # fallback: sentences are reused, asking about a word not asked about yet
+    for sent, s, offset, sent_start in key_sents:
         if len(questions) >= n: break
-        q = make_cloze_from_sentence(s) or make_wh_from_sentence(s, passage_text)
-        if q: questions.append(q)
-    for i, q in enumerate(questions):
-        q["id"] = f"q{i+1}"
+        avoid = asked.setdefault(s, set())
+        q = (_cloze_from_span(sent, s, offset, sent_start, avoid)
+             or _wh_from_span(sent, s, offset, passage_ents, sent_start, avoid))
+        if q and seen.add(q):
+            questions.append(q); avoid.add(q.correct_answer.lower())
     return questions[:n]
+
+def questions_from_doc(doc, n: int = 6) -> List[Question]:
+    """
+    Questions from an already-parsed passage. Key sentences are taken as
+    spans of `doc`, so nothing is parsed again; offsets are relative to doc.text.
+    """
+    from .utils import _rank_sentence_spans
+    key_sents = [(sent, s, start, start) for sent, s, start, _ in _rank_sentence_spans(doc, k=max(n*2, 8))]
+    random.shuffle(key_sents)
+    # the fallback pass revisits the same sentences, so near-duplicates are filtered
+    cloze_needed = max(1, n // 2)
+    questions = _fill_questions(key_sents, n, doc.ents, NearDuplicateFilter(), cloze_needed, n - cloze_needed)
+    return [replace(q, id=f"q{i+1}") for i, q in enumerate(questions)]
+
+@timed("qg.generate_questions")
+def generate_questions(passage_text: str, n: int = 6, cached: bool = True) -> List[Question]:
+    """cached=False for one-off passages (batch, API): parsed without going through the parse store."""
+    return questions_from_doc(parse(passage_text, cached=cached), n)
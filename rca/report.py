@@ -1,57 +1,54 @@
 # rca/report.py
+import csv
+import io
+import re
+import shutil
+import tempfile
+import zipfile
 from html import escape
-from typing import List, Dict, Optional
-
-def build_text_report(passage: str, questions: List[Dict], answers: Dict[str, str], student_name: Optional[str] = "") -> str:
-    lines = []
-    lines.append("Reading Comprehension – Quiz Report")
-    lines.append("=" * 40)
-    if student_name:
-        lines.append(f"Student: {student_name}")
-    lines.append("")
-    lines.append("Passage:")
-    lines.append(passage.strip())
-    lines.append("")
-    lines.append("Questions & Answers:")
-    correct_count = 0
-    for i, q in enumerate(questions, start=1):
-        user = answers.get(q["id"], "")
-        correct = q["correct_answer"]
-        is_correct = (user.strip().lower() == correct.strip().lower()) if q["qtype"] == "wh_mcq" else None
-        lines.append(f"{i}. ({q['qtype']}) {q['prompt']}")
-        lines.append(f"   - Student: {user or '(no answer)'}")
-        lines.append(f"   - Correct: {correct}")
-        if is_correct is not None:
-            lines.append(f"   - MCQ Correct?: {'Yes' if is_correct else 'No'}")
-        lines.append(f"   - Evidence: {q['evidence']}")
-        lines.append("")
-        if is_correct:
-            correct_count += 1
-    lines.append(f"Summary: {correct_count} correct (MCQ only), {len(questions)} total questions")
-    return "\n".join(lines)
-
-def build_html_report(passage: str, questions: List[Dict], answers: Dict[str, str], student_name: Optional[str] = "") -> str:
-    esc = escape
-    rows = []
-    for i, q in enumerate(questions, start=1):
-        user = answers.get(q["id"], "")
-        correct = q["correct_answer"]
-        rows.append(f"""
+from typing import List, Dict, Optional, Iterable, Tuple, Union, BinaryIO
+from .models import Question, as_questions
+from .utils import highlight_evidence
+
+# --- Shared (per-quiz) parts ---
+# Everything that doesn't depend on the student is rendered and escaped once
+# per quiz, so bulk reporting only formats each student's answers.
+
+class _ReportParts:
+    __slots__ = ("text_head", "text_questions", "html_rows", "html_head", "html_tail", "n_questions")
+
+    def __init__(self, passage: str, questions: Iterable[Question]):
+        esc = escape
+        questions = as_questions(questions)
+        self.n_questions = len(questions)
+        self.text_head = ["", "Passage:", passage.strip(), "", "Questions & Answers:"]
+        # (id, is_mcq, correct, heading line, evidence line)
+        self.text_questions = [
+            (q.id, q.qtype == "wh_mcq", q.correct_answer,
+             f"{i}. ({q.qtype}) {q.prompt}", f"   - Evidence: {q.evidence}")
+            for i, q in enumerate(questions, start=1)
+        ]
+        # (id, markup before the student cell, markup after it)
+        self.html_rows = [
+            (q.id,
+             f"""
         <tr>
           <td style="vertical-align:top;">{i}</td>
-          <td>{esc(q['qtype'])}</td>
-          <td>{esc(q['prompt'])}</td>
-          <td>{esc(user or '(no answer)')}</td>
-          <td>{esc(correct)}</td>
-          <td>{esc(q['evidence'])}</td>
+          <td>{esc(q.qtype)}</td>
+          <td>{esc(q.prompt)}</td>
+          <td>""",
+             f"""</td>
+          <td>{esc(q.correct_answer)}</td>
+          <td>{highlight_evidence(q, "<mark>", "</mark>", search=False)}</td>
         </tr>""")
-    table = "\n".join(rows)
-    student_line = f"<p><strong>Student:</strong> {esc(student_name)}</p>" if student_name else ""
-    return f"""
+            for i, q in enumerate(questions, start=1)
+        ]
+        self.html_head = """
 <html>
   <body style="font-family: Arial, sans-serif; color:#111;">
     <h2>Reading Comprehension – Quiz Report</h2>
-    {student_line}
+    """
+        self.html_tail = f"""
     <h3>Passage</h3>
     <p>{esc(passage.strip())}</p>
     <h3>Questions & Answers</h3>
@@ -62,9 +59,116 @@ def build_html_report(passage: str, questions: List[Dict], answers: Dict[str, st
         </tr>
       </thead>
       <tbody>
-        {table}
+        """
+
+    def mcq_results(self, answers: Dict[str, str]) -> List[Optional[bool]]:
+        """Per question: True/False for MCQ (case-insensitive exact match), None otherwise."""
+        return [
+            (answers.get(qid, "").strip().lower() == correct.strip().lower()) if is_mcq else None
+            for qid, is_mcq, correct, _, _ in self.text_questions
+        ]
+
+    def render_text(self, answers: Dict[str, str], student_name: Optional[str] = "",
+                    results: Optional[List[Optional[bool]]] = None) -> str:
+        lines = ["Reading Comprehension – Quiz Report", "=" * 40]
+        if student_name:
+            lines.append(f"Student: {student_name}")
+        lines.extend(self.text_head)
+        results = results if results is not None else self.mcq_results(answers)
+        correct_count = 0
+        for (qid, _, correct, heading, evidence), is_correct in zip(self.text_questions, results):
+            user = answers.get(qid, "")
+            lines.append(heading)
+            lines.append(f"   - Student: {user or '(no answer)'}")
+            lines.append(f"   - Correct: {correct}")
+            if is_correct is not None:
+                lines.append(f"   - MCQ Correct?: {'Yes' if is_correct else 'No'}")
+            lines.append(evidence)
+            lines.append("")
+            if is_correct:
+                correct_count += 1
+        lines.append(f"Summary: {correct_count} correct (MCQ only), {self.n_questions} total questions")
+        return "\n".join(lines)
+
+    def render_html(self, answers: Dict[str, str], student_name: Optional[str] = "") -> str:
+        table = "\n".join(before + escape(answers.get(qid, "") or '(no answer)') + after
+                          for qid, before, after in self.html_rows)
+        student_line = f"<p><strong>Student:</strong> {escape(student_name)}</p>" if student_name else ""
+        return f"""{self.html_head}{student_line}{self.html_tail}{table}
       </tbody>
     </table>
   </body>
 </html>
 """
+
+def build_text_report(passage: str, questions: List[Question], answers: Dict[str, str], student_name: Optional[str] = "") -> str:
+    return _ReportParts(passage, questions).render_text(answers, student_name)
+
+def build_html_report(passage: str, questions: List[Question], answers: Dict[str, str], student_name: Optional[str] = "") -> str:
+    return _ReportParts(passage, questions).render_html(answers, student_name)
+
+# --- Class-wide bundle ---
+
+def _safe_filename(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("_") or "student"
+
+def write_class_report_zip(
+    out: Union[str, BinaryIO],
+    passage: str,
+    questions: List[Question],
+    submissions: Iterable[Tuple[str, Dict[str, str]]],
+    include_text: bool = True,
+    include_html: bool = True,
+) -> Dict[str, int]:
+    """
+    Streams a report bundle for a whole class into a zip file (path or binary file object):
+      reports/NNN_<student>.txt / .html   one per student
+      class_summary.csv                   per-student MCQ score and answered count
+      question_summary.csv                per-question MCQ correct count
+    `submissions` is any iterable of (student_name, answers) pairs, e.g. a
+    generator over a database cursor; only one student's answers are held at
+    a time, so memory stays flat regardless of class size.
+    Returns {"students": ..., "questions": ...}.
+    """
+    questions = as_questions(questions)
+    parts = _ReportParts(passage, questions)
+    question_correct = [0] * len(questions)
+    mcq_total = sum(1 for q in questions if q.qtype == "wh_mcq")
+    students = 0
+
+    # Summary rows go to a spooled temp file (spills to disk for large classes)
+    # because a zip member can't stay open while the reports are written.
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+", newline="", encoding="utf-8") as summary, \
+            zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        summary_writer = csv.writer(summary)
+        summary_writer.writerow(["student", "mcq_correct", "mcq_total", "answered", "total_questions"])
+
+        for student_name, answers in submissions:
+            students += 1
+            results = parts.mcq_results(answers)
+            stem = f"reports/{students:03d}_{_safe_filename(student_name)}"
+            if include_text:
+                zf.writestr(stem + ".txt", parts.render_text(answers, student_name, results))
+            if include_html:
+                zf.writestr(stem + ".html", parts.render_html(answers, student_name))
+
+            for j, ok in enumerate(results):
+                if ok:
+                    question_correct[j] += 1
+            answered = sum(1 for q in questions if answers.get(q.id, "").strip())
+            summary_writer.writerow([student_name, sum(1 for ok in results if ok), mcq_total, answered, len(questions)])
+
+        summary.seek(0)
+        with zf.open("class_summary.csv", "w") as dst:
+            with io.TextIOWrapper(dst, encoding="utf-8", newline="") as text_dst:
+                shutil.copyfileobj(summary, text_dst)
+
+        q_csv = io.StringIO()
+        q_writer = csv.writer(q_csv)
+        q_writer.writerow(["question", "qtype", "prompt", "correct_answer", "mcq_correct", "students"])
+        for i, q in enumerate(questions):
+            q_writer.writerow([i + 1, q.qtype, q.prompt, q.correct_answer,
+                               question_correct[i] if q.qtype == "wh_mcq" else "", students])
+        zf.writestr("question_summary.csv", q_csv.getvalue())
+
+    return {"students": students, "questions": len(questions)}
@@ -0,0 +1,213 @@
+# rca/users.py
+"""
+SQLite-backed user directory.
+
+Passwords are stored as salted PBKDF2-SHA256 hashes; the cost
+(RCA_KDF_ITERATIONS) is recorded in each hash, so it can be raised later
+without invalidating existing accounts. Successful verifications are kept
+in a small in-memory cache (keyed by an HMAC of the password, never the
+password itself) and concurrent hash checks are capped, so a whole class
+logging in at once can't saturate the CPU.
+
+Bulk roster import:
+    python -m rca.users import roster.csv
+with columns username,password,role,name,class_name.
+"""
+import argparse
+import base64
+import csv
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+from .db import get_connection
+from .perf import timed
+
+KDF_ITERATIONS = int(os.getenv("RCA_KDF_ITERATIONS", "200000"))
+SALT_BYTES = 16
+CACHE_SIZE = 4096
+CACHE_TTL = 15 * 60  # seconds
+MAX_CONCURRENT_VERIFY = max(1, (os.cpu_count() or 2) // 2)
+ROLES = ("Teacher", "Student")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL,
+    role TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    class_name TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_users_class ON users(class_name);
+"""
+
+# --- Password hashing ---
+
+def hash_password(password: str, iterations: int = None) -> str:
+    iterations = iterations or KDF_ITERATIONS
+    salt = secrets.token_bytes(SALT_BYTES)
+    dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return "pbkdf2_sha256${}${}${}".format(
+        iterations, base64.b64encode(salt).decode("ascii"), base64.b64encode(dk).decode("ascii"))
+
+def verify_password(password: str, stored: str) -> bool:
+    """False for a wrong password or a malformed stored hash."""
+    try:
+        algo, iterations, salt_b64, dk_b64 = stored.split("$")
+        if algo != "pbkdf2_sha256":
+            return False
+        salt, expected = base64.b64decode(salt_b64), base64.b64decode(dk_b64)
+        dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, int(iterations))
+    except ValueError:  # bad field count, base64, or iteration count
+        return False
+    return hmac.compare_digest(dk, expected)
+
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    """Hash checked for unknown usernames, so they take as long to reject as a wrong password."""
+    return hash_password(secrets.token_urlsafe(16))
+
+# --- Verified-credentials cache ---
+
+_cache_key = secrets.token_bytes(32)  # per process; cached entries never hold the password
+_cache_lock = threading.Lock()
+_verified: "OrderedDict[str, tuple]" = OrderedDict()  # username -> (password mac, stored hash, expiry)
+_verify_slots = threading.BoundedSemaphore(MAX_CONCURRENT_VERIFY)
+
+def _password_mac(username: str, password: str) -> bytes:
+    return hmac.new(_cache_key, f"{username}\0{password}".encode("utf-8"), hashlib.sha256).digest()
+
+def _cache_get(username: str, mac: bytes, stored: str) -> bool:
+    with _cache_lock:
+        entry = _verified.get(username)
+        if entry is None:
+            return False
+        if entry[2] < time.monotonic() or entry[1] != stored:
+            del _verified[username]
+            return False
+        _verified.move_to_end(username)
+        return hmac.compare_digest(entry[0], mac)
+
+def _cache_put(username: str, mac: bytes, stored: str):
+    with _cache_lock:
+        _verified[username] = (mac, stored, time.monotonic() + CACHE_TTL)
+        _verified.move_to_end(username)
+        while len(_verified) > CACHE_SIZE:
+            _verified.popitem(last=False)
+
+def clear_cache():
+    with _cache_lock:
+        _verified.clear()
+
+# --- Storage ---
+
+def _conn():
+    return get_connection(schema=_SCHEMA, init=_seed_demo_users)
+
+def _seed_demo_users(conn):
+    """First run only: load the demo accounts from rca.auth so a fresh install can log in."""
+    if conn.execute("SELECT 1 FROM users LIMIT 1").fetchone():
+        return
+    from .auth import USER_CREDENTIALS
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO users (username, password_hash, role, name, class_name) VALUES (?, ?, ?, ?, ?)",
+            [(u, hash_password(d["password"]), d["role"], d.get("name", ""), d.get("class_name"))
+             for u, d in USER_CREDENTIALS.items()],
+        )
+
+def get_user(username: str) -> Optional[Dict[str, str]]:
+    """User record without the password hash, or None."""
+    row = _conn().execute("SELECT username, role, name, class_name FROM users WHERE username = ?",
+                          (username,)).fetchone()
+    return dict(row) if row else None
+
+@timed("users.authenticate")
+def authenticate(username: str, password: str) -> Optional[Dict[str, str]]:
+    """Returns the user record if the credentials are valid, else None."""
+    row = _conn().execute("SELECT username, password_hash, role, name, class_name FROM users WHERE username = ?",
+                          (username,)).fetchone()
+    if row is None:
+        # same PBKDF2 cost as a known user, or response times would reveal which usernames exist
+        with _verify_slots:
+            verify_password(password, _dummy_hash())
+        return None
+    user = {k: row[k] for k in ("username", "role", "name", "class_name")}
+    mac = _password_mac(username, password)
+    if _cache_get(username, mac, row["password_hash"]):
+        return user
+    with _verify_slots:
+        ok = verify_password(password, row["password_hash"])
+    if not ok:
+        return None
+    _cache_put(username, mac, row["password_hash"])
+    return user
+
+def set_password(username: str, password: str, iterations: int = None):
+    conn = _conn()
+    with conn:
+        conn.execute("UPDATE users SET password_hash = ? WHERE username = ?",
+                     (hash_password(password, iterations), username))
+    with _cache_lock:
+        _verified.pop(username, None)
+
+# --- Bulk import ---
+
+def import_users(records: Iterable[Dict[str, str]], iterations: int = None, workers: int = None) -> int:
+    """
+    Inserts or updates users in a single transaction. Records need username,
+    password and role (Teacher/Student); name and class_name are optional.
+    Hashing is spread over a thread pool (hashlib releases the GIL during
+    PBKDF2). Raises ValueError on an invalid record; nothing is written then.
+    """
+    rows: List[Dict[str, str]] = []
+    for i, r in enumerate(records, start=1):
+        username = (r.get("username") or "").strip()
+        role = (r.get("role") or "").strip().title()
+        if not username or not r.get("password"):
+            raise ValueError(f"Record {i}: username and password are required.")
+        if role not in ROLES:
+            raise ValueError(f"Record {i}: role must be one of {', '.join(ROLES)}.")
+        rows.append({"username": username, "password": r["password"], "role": role,
+                     "name": (r.get("name") or "").strip(), "class_name": (r.get("class_name") or "").strip() or None})
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 2) as pool:
+        hashes = list(pool.map(lambda r: hash_password(r["password"], iterations), rows))
+
+    conn = _conn()
+    with conn:
+        conn.executemany(
+            "INSERT INTO users (username, password_hash, role, name, class_name) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(username) DO UPDATE SET password_hash = excluded.password_hash, role = excluded.role, "
+            "name = excluded.name, class_name = excluded.class_name",
+            [(r["username"], h, r["role"], r["name"], r["class_name"]) for r, h in zip(rows, hashes)],
+        )
+    clear_cache()
+    return len(rows)
+
+def import_roster_csv(path: str, iterations: int = None) -> int:
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return import_users(csv.DictReader(f), iterations=iterations)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RCA user directory")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import", help="bulk import a CSV roster (username,password,role,name,class_name)")
+    imp.add_argument("csv_path")
+    imp.add_argument("--iterations", type=int, default=None, help=f"KDF cost (default {KDF_ITERATIONS})")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "import":
+        start = time.perf_counter()
+        n = import_roster_csv(args.csv_path, iterations=args.iterations)
+        print(f"Imported {n} users in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
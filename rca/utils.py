@@ -1,35 +1,133 @@
 import re
-from typing import List
-from .nlp import get_nlp
+import hashlib
+from functools import lru_cache
+from html import escape
+from typing import List, Optional, Tuple
+import numpy as np
+from spacy.attrs import IS_ALPHA, IS_STOP, IS_SPACE, SENT_START
+from spacy.tokens import Span
+from .parse_store import parse
 from .constants import SUPPORTED_ENTS
+from .perf import timed
 
 def split_sentences(text: str) -> List[str]:
-    nlp = get_nlp()
-    doc = nlp(text)
+    doc = parse(text)
     return [s.text.strip() for s in doc.sents if s.text.strip()]
 
-def pick_key_sentences(text: str, k: int = 8) -> List[str]:
-    nlp = get_nlp()
-    doc = nlp(text)
-    scored = []
-    for sent in doc.sents:
-        s = sent.text.strip()
-        if not s:
-            continue
-        ents = [ent for ent in sent.ents if ent.label_ in SUPPORTED_ENTS]
-        score = len([t for t in sent if t.is_alpha and not t.is_stop]) + 3*len(ents)
-        scored.append((score, s))
-    scored.sort(key=lambda x: x[0], reverse=True)
-    uniq, seen = [], set()
-    for _, s in scored:
-        if s not in seen:
-            uniq.append(s); seen.add(s)
-        if len(uniq) >= k:
-            break
-    return uniq
-
-def highlight_span(sentence: str, span: str) -> str:
+def _strip_offsets(sent) -> Tuple[str, int, int]:
+    """Stripped sentence text with its character offsets in the parsed text."""
+    raw = sent.text
+    s = raw.strip()
+    start = sent.start_char + (len(raw) - len(raw.lstrip()))
+    return s, start, start + len(s)
+
+def _sentence_scores(doc) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-sentence scores computed from token arrays:
+      content words (alpha, non-stop) + 3 * supported entities inside the sentence.
+    Returns (sentence start token indices, scores); whitespace-only sentences score -1.
+    """
+    arr = doc.to_array([IS_ALPHA, IS_STOP, IS_SPACE, SENT_START])
+    n = len(doc)
+    is_start = arr[:, 3].astype(np.int64) == 1  # SENT_START is stored as uint64 (-1 wraps)
+    is_start[0] = True
+    starts = np.flatnonzero(is_start)
+    ends = np.append(starts[1:], n)
+
+    content = (arr[:, 0] == 1) & (arr[:, 1] == 0)
+    scores = np.add.reduceat(content.astype(np.int64), starts)
+
+    # entities count toward a sentence only if they lie fully inside it (as Span.ents)
+    ent_bounds = [(e.start, e.end) for e in doc.ents if e.label_ in SUPPORTED_ENTS]
+    if ent_bounds:
+        eb = np.asarray(ent_bounds, dtype=np.int64)
+        sent_of = np.searchsorted(starts, eb[:, 0], side="right") - 1
+        inside = eb[:, 1] <= ends[sent_of]
+        scores += 3 * np.bincount(sent_of[inside], minlength=len(starts))
+
+    # sentences made only of whitespace tokens are skipped (they strip to "")
+    non_space = np.add.reduceat((arr[:, 2] == 0).astype(np.int64), starts)
+    scores[non_space == 0] = -1
+    return starts, scores
+
+def _rank_sentences(doc, k: int) -> List[Tuple[str, int, int]]:
+    return [(s, start, end) for _, s, start, end in _rank_sentence_spans(doc, k)]
+
+def _rank_sentence_spans(doc, k: int) -> List[Tuple[Span, str, int, int]]:
+    """
+    Top-k unique sentences by score as (span, stripped text, start, end), ties
+    in document order (same ranking as a stable full sort). Uses argpartition
+    on a candidate pool that only grows when duplicate sentences eat into it.
+    """
+    if len(doc) == 0 or k <= 0:
+        return []
+    if not doc.has_annotation("SENT_START"):
+        list(doc.sents)  # raise spaCy's usual "sentence boundaries unset" error
+    starts, scores = _sentence_scores(doc)
+    ends = np.append(starts[1:], len(doc))
+    n = len(starts)
+    valid = int((scores >= 0).sum())
+    # unique sort key: higher score first, then earlier sentence first
+    key = scores * (n + 1) + (n - np.arange(n))
+
+    pool = min(n, k)
+    while True:
+        top = np.argpartition(-key, pool - 1)[:pool] if pool < n else np.arange(n)
+        top = top[np.argsort(-key[top])]
+        uniq, seen = [], set()
+        for i in top:
+            if scores[i] < 0:
+                break
+            sent = doc[int(starts[i]):int(ends[i])]
+            item = (sent,) + _strip_offsets(sent)
+            if item[1] not in seen:
+                uniq.append(item); seen.add(item[1])
+            if len(uniq) >= k:
+                return uniq
+        if pool >= min(n, valid) or pool >= n:
+            return uniq
+        pool = min(n, pool * 2)
+
+@timed("utils.pick_key_sentences")
+def pick_key_sentence_spans(text: str, k: int = 8, cached: bool = True) -> List[Tuple[str, int, int]]:
+    """Top-k sentences as (sentence, start, end), offsets into `text`."""
+    return _rank_sentences(parse(text, cached=cached), k)
+
+def pick_key_sentences(text: str, k: int = 8, cached: bool = True) -> List[str]:
+    return [s for s, _, _ in pick_key_sentence_spans(text, k, cached)]
+
+@lru_cache(maxsize=1024)
+def _span_pattern(span: str) -> "re.Pattern":
+    return re.compile(re.escape(span), re.IGNORECASE)
+
+def highlight_span(sentence: str, span: str, start: Optional[int] = None, end: Optional[int] = None) -> str:
+    """
+    Wraps the answer in a highlight <span>. With offsets (from the question)
+    this is a direct slice; without them, falls back to a case-insensitive
+    search for the first match.
+    """
+    if start is not None and end is not None and 0 <= start < end <= len(sentence):
+        return f"{sentence[:start]}<span class='highlight'>{sentence[start:end]}</span>{sentence[end:]}"
     if not span:
         return sentence
-    pattern = re.compile(re.escape(span), re.IGNORECASE)
-    return pattern.sub(lambda m: f"<span class='highlight'>{m.group(0)}</span>", sentence, count=1)
+    return _span_pattern(span).sub(lambda m: f"<span class='highlight'>{m.group(0)}</span>", sentence, count=1)
+
+def highlight_evidence(q, open_tag: str = "<span class='highlight'>", close_tag: str = "</span>",
+                       search: bool = True) -> str:
+    """
+    HTML-escaped evidence sentence of a Question with its answer wrapped in
+    open_tag/close_tag, sliced at the question's offsets. Questions without
+    (valid) offsets fall back to a search when `search` is set.
+    """
+    found = q.answer_span()
+    if found is None and search and q.correct_answer:
+        m = _span_pattern(q.correct_answer).search(q.evidence)
+        found = m.span() if m else None
+    if found is None:
+        return escape(q.evidence)
+    a, b = found
+    return f"{escape(q.evidence[:a])}{open_tag}{escape(q.evidence[a:b])}{close_tag}{escape(q.evidence[b:])}"
+
+def text_hash(text: str) -> str:
+    """Stable content hash of a passage (used to key stored results)."""
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()